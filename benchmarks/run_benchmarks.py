@@ -0,0 +1,364 @@
+#!/usr/bin/env python
+"""
+Benchmarks for the check engine, report rendering, configuration loading
+and CLI start-up.
+
+Results are written as JSON, and can be compared with a previous run:
+
+    python benchmarks/run_benchmarks.py -o results.json
+    python benchmarks/run_benchmarks.py -o new.json --compare results.json
+
+Benchmarks against Postgres and SMTP are only run with `--with-services`,
+see `run_postgres_mailpit.sh`.
+"""
+
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from datetime import timezone
+from pathlib import Path
+
+import click
+import yaml
+
+import fractal_healthcheck
+from fractal_healthcheck import LOGGER_NAME
+from fractal_healthcheck.checks import Check
+from fractal_healthcheck.checks import CheckSuite
+from fractal_healthcheck.checks import load_check_suite
+from fractal_healthcheck.checks.CheckResults import CheckResult
+from fractal_healthcheck.report import GeneralSettings
+from fractal_healthcheck.report import MailSettings
+from fractal_healthcheck.report import prepare_report
+from fractal_healthcheck.report import report_to_email
+
+from stand_ins import fake_proc
+from stand_ins import json_http_server
+from stand_ins import make_fake_journalctl
+from stand_ins import make_fake_proc
+from stand_ins import prepend_to_path
+
+
+def _timeit(function, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        t_start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - t_start)
+    return dict(
+        repeat=repeat,
+        min=min(timings),
+        median=statistics.median(timings),
+        mean=statistics.mean(timings),
+        max=max(timings),
+    )
+
+
+def _peak_memory(function) -> int:
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def _synthetic_suite(base_url: str, copies: int) -> CheckSuite:
+    checks = []
+    for ind in range(copies):
+        checks.extend(
+            [
+                Check(
+                    name=f"URL {ind}",
+                    function_name="url_json",
+                    kwargs=dict(url=f"{base_url}/api/alive/"),
+                ),
+                Check(name=f"Processes {ind}", function_name="count_processes"),
+                Check(name=f"Memory {ind}", function_name="memory_usage"),
+                Check(
+                    name=f"Service logs {ind}",
+                    function_name="service_logs",
+                    kwargs=dict(
+                        service="fractal-server",
+                        time_interval="1 hour ago",
+                        target_words=["ERROR", "CRITICAL"],
+                    ),
+                ),
+                Check(
+                    name=f"Command {ind}",
+                    function_name="subprocess_run",
+                    kwargs=dict(command="sleep 0.02"),
+                ),
+            ]
+        )
+    return CheckSuite(checks=checks)
+
+
+def bench_suite_run(tmpdir: Path, repeat: int, copies: int, max_workers: int) -> dict:
+    results = {}
+    proc_root = make_fake_proc(tmpdir / "proc")
+    bindir = make_fake_journalctl(tmpdir / "bin", num_lines=100_000)
+    with (
+        fake_proc(proc_root),
+        prepend_to_path(bindir),
+        json_http_server(delay_seconds=0.02) as base_url,
+    ):
+        for label, workers in (("serial", 1), ("parallel", max_workers)):
+            suite = _synthetic_suite(base_url, copies=copies)
+            results[f"suite_run_{label}"] = dict(
+                num_checks=len(suite.checks),
+                max_workers=workers,
+                **_timeit(lambda: suite.run(max_workers=workers), repeat),
+            )
+    return results
+
+
+def bench_prepare_report(repeat: int, num_checks: int, log_size: int) -> dict:
+    checks = [
+        Check(
+            name=f"Check {ind}",
+            function_name="count_processes",
+            result=CheckResult(
+                log=("x" * 99 + "\n") * (log_size // 100),
+                success=(ind % 10 != 0),
+            ),
+        )
+        for ind in range(num_checks)
+    ]
+    suite = CheckSuite(checks=checks)
+    results = {}
+    for report_format in ("text", "json", "html"):
+
+        def _render():
+            prepare_report(
+                suite,
+                checks_runtime=1.0,
+                instance_name="benchmark",
+                general_settings=GeneralSettings(),
+                report_format=report_format,
+            )
+
+        results[f"prepare_report_{report_format}"] = dict(
+            num_checks=num_checks,
+            log_size=log_size,
+            peak_memory_bytes=_peak_memory(_render),
+            **_timeit(_render, repeat),
+        )
+    return results
+
+
+def bench_load_config(tmpdir: Path, repeat: int, num_checks: int) -> dict:
+    config_file = tmpdir / "many_checks.yaml"
+    config = dict(
+        checks=[
+            dict(
+                name=f"Disk usage {ind}",
+                function_name="disk_usage",
+                kwargs=dict(mountpoint=f"/data/share-{ind}", max_perc_usage=85),
+            )
+            for ind in range(num_checks)
+        ]
+    )
+    with config_file.open("w") as f:
+        yaml.safe_dump(config, f)
+    return {
+        "load_check_suite": dict(
+            num_checks=num_checks,
+            **_timeit(lambda: load_check_suite(config_file.as_posix()), repeat),
+        )
+    }
+
+
+def bench_cli_cold_start(repeat: int) -> dict:
+    commands = {
+        "cli_import": [sys.executable, "-c", "import fractal_healthcheck.main"],
+        "cli_help": [sys.executable, "-m", "fractal_healthcheck.main", "--help"],
+    }
+    return {
+        name: _timeit(
+            lambda: subprocess.run(command, check=True, capture_output=True),
+            repeat,
+        )
+        for name, command in commands.items()
+    }
+
+
+def bench_services(tmpdir: Path, repeat: int) -> dict:
+    """
+    Benchmarks against the containers started by `run_postgres_mailpit.sh`.
+    """
+    results = {}
+    suite = CheckSuite(
+        checks=[
+            Check(
+                name="Postgres",
+                function_name="postgresql_db_info",
+                kwargs=dict(
+                    dbname="postgres",
+                    user="postgres",
+                    password="postgres",
+                    port=int(os.getenv("BENCHMARK_POSTGRES_PORT", "5432")),
+                ),
+            )
+        ]
+    )
+    results["postgresql_db_info"] = _timeit(suite.run, repeat)
+    if suite.any_failing:
+        raise RuntimeError(f"Postgres check failed: {suite.checks[0].result}")
+
+    report = prepare_report(
+        suite,
+        checks_runtime=1.0,
+        instance_name="benchmark",
+        general_settings=GeneralSettings(),
+    )
+    status_file = tmpdir / "status.yaml"
+    mail_settings = MailSettings(
+        smtp_server="localhost",
+        smpt_server_port=int(os.getenv("BENCHMARK_SMTP_PORT", "1025")),
+        sender="sender@example.org",
+        include_starttls=False,
+        password="fakepassword",
+        recipients=["recipient1@example.org"],
+        status_file=status_file.as_posix(),
+        grace_time_not_triggering_hours=0,
+        grace_time_triggering_hours=0,
+        instance_name="benchmark",
+    )
+    results["report_to_email"] = _timeit(
+        lambda: report_to_email(
+            check_suite=suite, report=report, mail_settings=mail_settings
+        ),
+        repeat,
+    )
+    return results
+
+
+def _metadata() -> dict:
+    try:
+        git_commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            encoding="utf-8",
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except Exception:
+        git_commit = None
+    return dict(
+        version=fractal_healthcheck.__VERSION__,
+        git_commit=git_commit,
+        timestamp=datetime.now(tz=timezone.utc).isoformat(),
+        python=platform.python_version(),
+        platform=platform.platform(),
+        cpu_count=os.cpu_count(),
+    )
+
+
+def _compare(results: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    Print the median-time ratio of each benchmark with respect to a baseline,
+    and return the names of the ones slower than `threshold`.
+    """
+    regressions = []
+    click.echo(f"Comparison with version {baseline['metadata']['version']}:")
+    for name, new in results["benchmarks"].items():
+        old = baseline["benchmarks"].get(name)
+        if old is None:
+            click.echo(f"  {name}: new benchmark")
+            continue
+        ratio = new["median"] / old["median"]
+        flag = ""
+        if ratio > threshold:
+            flag = "  <-- REGRESSION"
+            regressions.append(name)
+        click.echo(
+            f"  {name}: {old['median']:.4f}s -> {new['median']:.4f}s "
+            f"(x{ratio:.2f}){flag}"
+        )
+    return regressions
+
+
+@click.command()
+@click.option(
+    "-o",
+    "--output",
+    "output",
+    type=click.Path(dir_okay=False),
+    required=True,
+    help="Write results to this JSON file.",
+)
+@click.option(
+    "--compare",
+    "baseline",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Compare with the results in this JSON file.",
+)
+@click.option(
+    "--threshold",
+    type=click.FLOAT,
+    default=1.2,
+    help="Median-time ratio above which a benchmark counts as a regression.",
+)
+@click.option("--repeat", type=click.INT, default=5)
+@click.option("--quick", is_flag=True, help="Use smaller sizes.")
+@click.option("--max-workers", type=click.INT, default=8)
+@click.option(
+    "--with-services",
+    is_flag=True,
+    help="Also run benchmarks against local Postgres and SMTP services.",
+)
+def main(
+    output: str,
+    baseline: str | None,
+    threshold: float,
+    repeat: int,
+    quick: bool,
+    max_workers: int,
+    with_services: bool,
+):
+    # Keep per-check logging (e.g. truncation warnings) out of the timings
+    logging.getLogger(LOGGER_NAME).setLevel(logging.ERROR)
+
+    scale = 10 if quick else 1
+    benchmarks = {}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        tmpdir = Path(tmpdir)
+        benchmarks.update(
+            bench_suite_run(
+                tmpdir, repeat=repeat, copies=20 // scale, max_workers=max_workers
+            )
+        )
+        benchmarks.update(
+            bench_prepare_report(repeat, num_checks=500 // scale, log_size=50_000)
+        )
+        benchmarks.update(
+            bench_load_config(tmpdir, repeat=repeat, num_checks=5_000 // scale)
+        )
+        benchmarks.update(bench_cli_cold_start(repeat))
+        if with_services:
+            benchmarks.update(bench_services(tmpdir, repeat))
+
+    results = dict(metadata=_metadata(), benchmarks=benchmarks)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    for name, values in benchmarks.items():
+        click.echo(f"{name}: median {values['median']:.4f}s")
+
+    if baseline is not None:
+        with open(baseline) as f:
+            regressions = _compare(results, json.load(f), threshold)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
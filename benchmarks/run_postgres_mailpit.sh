@@ -0,0 +1,19 @@
+#!/bin/bash
+
+# Start the local services used by `run_benchmarks.py --with-services`.
+docker run \
+    --rm \
+    -d \
+    --name benchmark-postgres \
+    -p 5432:5432 \
+    -e POSTGRES_PASSWORD=postgres \
+    postgres:17 \
+&&
+docker run \
+    --rm \
+    --name=benchmark-mailpit \
+    -p 8025:8025 \
+    -p 1025:1025 \
+    -e MP_SMTP_AUTH="sender@example.org:fakepassword" \
+    -e MP_SMTP_AUTH_ALLOW_INSECURE=true \
+    axllent/mailpit
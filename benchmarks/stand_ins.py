@@ -0,0 +1,121 @@
+"""
+Local stand-ins for the external systems used by the checks, so that
+benchmarks do not depend on the state of the host.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer
+from pathlib import Path
+
+import psutil
+
+# Fake executables are written as in the tests
+sys.path.insert(0, (Path(__file__).parents[1] / "tests").as_posix())
+from conftest import write_executable  # noqa: E402
+
+MEMINFO = """\
+MemTotal:       65841364 kB
+MemFree:        21324232 kB
+MemAvailable:   48121520 kB
+Buffers:          905220 kB
+Cached:         24533900 kB
+SwapCached:            0 kB
+Active:         19741188 kB
+Inactive:       20661740 kB
+Shmem:            618080 kB
+Slab:            2151504 kB
+SReclaimable:    1683212 kB
+SwapTotal:       8388604 kB
+SwapFree:        8388604 kB
+"""
+
+
+def make_fake_proc(root: Path, num_processes: int = 5_000) -> Path:
+    """
+    Create a minimal `/proc` tree, with `meminfo`, `loadavg` and
+    `num_processes` numeric (PID) folders.
+    """
+    root.mkdir(parents=True, exist_ok=True)
+    (root / "meminfo").write_text(MEMINFO)
+    (root / "loadavg").write_text("0.52 0.58 0.59 2/1234 56789\n")
+    for pid in range(1, num_processes + 1):
+        (root / str(pid)).mkdir(exist_ok=True)
+    return root
+
+
+@contextmanager
+def fake_proc(root: Path):
+    """
+    Point psutil to the fake `/proc` tree.
+    """
+    old_procfs_path = psutil.PROCFS_PATH
+    psutil.PROCFS_PATH = root.as_posix()
+    try:
+        yield root
+    finally:
+        psutil.PROCFS_PATH = old_procfs_path
+
+
+def make_fake_journalctl(bindir: Path, num_lines: int, error_every: int = 1_000):
+    """
+    Write an executable `journalctl` which prints `num_lines` synthetic
+    journal lines, one every `error_every` containing "ERROR".
+    """
+    write_executable(
+        bindir,
+        "journalctl",
+        "import sys\n"
+        "out = sys.stdout\n"
+        f"for i in range({num_lines}):\n"
+        f"    level = 'ERROR' if i % {error_every} == 0 else 'INFO'\n"
+        "    out.write(f'Jan 01 00:00:00 host fractal-server[123]: {level} "
+        "message number {i}\\n')\n",
+    )
+    return bindir
+
+
+@contextmanager
+def prepend_to_path(bindir: Path):
+    old_path = os.environ["PATH"]
+    os.environ["PATH"] = f"{bindir.as_posix()}{os.pathsep}{old_path}"
+    try:
+        yield
+    finally:
+        os.environ["PATH"] = old_path
+
+
+@contextmanager
+def json_http_server(delay_seconds: float = 0.0):
+    """
+    Serve a small JSON document on a local port, optionally after a delay
+    (to emulate a remote service). Yields the base URL.
+    """
+    body = json.dumps({"status": "ok", "version": "0.0.0"}).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if delay_seconds:
+                time.sleep(delay_seconds)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
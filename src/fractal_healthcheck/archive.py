@@ -0,0 +1,167 @@
+import bisect
+import gzip
+import json
+import logging
+import os
+from datetime import datetime
+from datetime import timedelta
+from pathlib import Path
+
+from pydantic import BaseModel
+from pydantic import Field
+
+from fractal_healthcheck import LOGGER_NAME
+from fractal_healthcheck.utils import atomic_write
+
+logger = logging.getLogger(LOGGER_NAME)
+
+INDEX_FILENAME = "index.jsonl"
+SEGMENT_TIME_FORMAT = "%Y%m%dT%H%M%S"
+
+
+class ArchiveSettings(BaseModel):
+    directory: str
+    max_segment_bytes: int = Field(default=64 * 2**20, gt=0)
+    max_segment_age_hours: float | None = Field(default=24, gt=0)
+    max_segments: int | None = Field(default=None, ge=1)
+
+
+class ReportArchive:
+    """
+    Archive of reports, stored in segment files `reports-<timestamp>.gz`.
+
+    Each report is appended to the current segment as its own gzip member,
+    so that a segment is a valid gzip file (e.g. for `zcat`) and any single
+    report can be read by seeking to its offset. A new segment starts when
+    the current one exceeds `max_segment_bytes` or `max_segment_age_hours`,
+    and only the last `max_segments` segments are kept.
+
+    The index (`index.jsonl`) has one line per report, with its timestamp,
+    status, segment, offset and length.
+    """
+
+    def __init__(self, settings: ArchiveSettings):
+        self.settings = settings
+        self.directory = Path(settings.directory)
+        self.index_file = self.directory / INDEX_FILENAME
+
+    def read_index(self) -> list[dict]:
+        if not self.index_file.exists():
+            return []
+        with self.index_file.open("r") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def _last_entry(self) -> dict | None:
+        """
+        Read the last index entry, without reading the whole index.
+        """
+        if not self.index_file.exists():
+            return None
+        with self.index_file.open("rb") as f:
+            size = f.seek(0, os.SEEK_END)
+            f.seek(max(size - 4096, 0))
+            lines = f.read().splitlines()
+        for line in reversed(lines):
+            if line.strip():
+                return json.loads(line)
+        return None
+
+    def _current_segment(self, timestamp: datetime) -> tuple[str, bool]:
+        """
+        Name of the segment for a report at `timestamp`, and whether it is a
+        new one.
+        """
+        new_segment = f"reports-{timestamp.strftime(SEGMENT_TIME_FORMAT)}.gz"
+        last_entry = self._last_entry()
+        if last_entry is None:
+            return new_segment, True
+        segment = last_entry["segment"]
+        path = self.directory / segment
+        if not path.exists():
+            return new_segment, True
+        if path.stat().st_size >= self.settings.max_segment_bytes:
+            return new_segment, True
+        if self.settings.max_segment_age_hours is not None:
+            created = datetime.strptime(
+                segment.removeprefix("reports-").removesuffix(".gz"),
+                SEGMENT_TIME_FORMAT,
+            ).replace(tzinfo=timestamp.tzinfo)
+            if timestamp - created > timedelta(
+                hours=self.settings.max_segment_age_hours
+            ):
+                return new_segment, True
+        return segment, False
+
+    def add(
+        self,
+        report: str,
+        *,
+        timestamp: datetime,
+        status: str,
+        report_format: str = "text",
+    ) -> dict:
+        """
+        Append a report to the archive, and return its index entry.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        segment, is_new = self._current_segment(timestamp)
+        data = gzip.compress(report.encode("utf-8"))
+        with (self.directory / segment).open("ab") as f:
+            offset = f.tell()
+            f.write(data)
+        entry = dict(
+            timestamp=timestamp.isoformat(),
+            status=status,
+            format=report_format,
+            segment=segment,
+            offset=offset,
+            length=len(data),
+        )
+        with self.index_file.open("a") as f:
+            f.write(json.dumps(entry) + "\n")
+        if is_new:
+            logger.info(f"[ReportArchive] New segment {segment}")
+            self._prune()
+        return entry
+
+    def _prune(self):
+        if self.settings.max_segments is None:
+            return
+        index = self.read_index()
+        segments = list(dict.fromkeys(entry["segment"] for entry in index))
+        to_remove = set(segments[: -self.settings.max_segments])
+        if not to_remove:
+            return
+        atomic_write(
+            self.index_file.as_posix(),
+            "".join(
+                json.dumps(entry) + "\n"
+                for entry in index
+                if entry["segment"] not in to_remove
+            ),
+        )
+        for segment in to_remove:
+            logger.info(f"[ReportArchive] Remove segment {segment}")
+            (self.directory / segment).unlink(missing_ok=True)
+
+    def read(self, entry: dict) -> str:
+        with (self.directory / entry["segment"]).open("rb") as f:
+            f.seek(entry["offset"])
+            data = f.read(entry["length"])
+        return gzip.decompress(data).decode("utf-8")
+
+    def lookup(
+        self, at: datetime | None = None, failing_only: bool = False
+    ) -> dict | None:
+        """
+        Find the index entry of the last report at or before `at` (or the
+        last one overall), optionally only among failing reports.
+        """
+        index = self.read_index()
+        if at is not None:
+            timestamps = [datetime.fromisoformat(entry["timestamp"]) for entry in index]
+            index = index[: bisect.bisect_right(timestamps, at)]
+        for entry in reversed(index):
+            if not failing_only or entry["status"] != "PASS":
+                return entry
+        return None
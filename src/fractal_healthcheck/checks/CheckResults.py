@@ -1,45 +1,126 @@
+import io
+import json
 import logging
-from pydantic import BaseModel
-from pydantic import ConfigDict
+from dataclasses import dataclass
+from dataclasses import field
+from dataclasses import fields
+from typing import Any
+from typing import TextIO
 import textwrap
 
 
-class CheckResult(BaseModel):
+def render_exception(exception: BaseException) -> str:
+    # exceptions from subprocess have some useful attributes, try to include them
+    try:
+        return f"{exception.__class__}: {exception.args[0]}, stderr: {exception.stderr}"
+    except (AttributeError, IndexError):
+        return f"{exception.__class__}: {exception}"
+
+
+@dataclass(slots=True)
+class CheckResult:
+    """
+    Result of a check run.
+
+    This is a slotted dataclass rather than a pydantic model, since many
+    results are created and kept around (e.g. in fleet mode). An exception
+    passed as `exception` is rendered to a string right away, so that no
+    exception (with its traceback and frames) is kept alive.
+    """
+
     log: str = "N/A"
-    exception: Exception | None = None
+    exception: str | None = None
     success: bool = True
+    skipped: bool = False
+    timed_out: bool = False
+    runtime: float | None = None
+    attempts: int = 1
+    flakiness: float | None = None
+    metrics: dict[str, float] = field(default_factory=dict)
+    # Outputs of diagnostic collectors, for failing checks
+    diagnostics: dict[str, str] = field(default_factory=dict)
 
-    model_config = ConfigDict(arbitrary_types_allowed=True)
+    def __post_init__(self):
+        if isinstance(self.exception, BaseException):
+            self.exception = render_exception(self.exception)
 
     @property
     def status(self) -> str:
+        if self.skipped:
+            return "SKIPPED"
+        if self.timed_out:
+            return "TIMEOUT"
         if self.success:
             return "PASS"
         else:
             return "FAIL"
 
+    @property
+    def attempts_info(self) -> str | None:
+        """
+        Number of attempts and flakiness rate, if there is anything to say.
+        """
+        if self.attempts == 1 and not self.flakiness:
+            return None
+        info = f"{self.attempts}"
+        if self.flakiness is not None:
+            info = f"{info} (flakiness over recent runs: {self.flakiness:.0%})"
+        return info
+
     @property
     def full_log(self) -> str:
         if self.exception is not None:
-            # exceptions from subprocess have some useful attributes, try to include them
-            try:
-                log_str = f"{self.exception.__class__}: {self.exception.args[0]}, stderr: {self.exception.stderr}"
-            except (AttributeError, IndexError):
-                log_str = f"{self.exception.__class__}: {self.exception}"
+            log_str = self.exception
         else:
             log_str = self.log
 
         return log_str.strip("\n") + "\n"
 
-    def format_for_report(self, name: str, max_log_size: int) -> str:
+    def write_for_report(self, f: TextIO, name: str, max_log_size: int) -> bool:
+        """
+        Write the text-report section of this result to `f`.
+        Returns whether the log was truncated to `max_log_size`.
+        """
         log = self.full_log
-        if len(log) > max_log_size:
-            logging.warning(f"{len(log)=} is larger than {max_log_size=}, truncate")
+        truncated = len(log) > max_log_size
+        if truncated:
             log = f"[TRUNCATED]\n{log[:max_log_size]}"
+        f.write(f"Check: {name}\nStatus: {self.status}\n")
+        if self.attempts_info:
+            f.write(f"Attempts: {self.attempts_info}\n")
+        f.write("Logs:\n")
+        f.write(textwrap.indent(log, "> "))
+        for collector, output in self.diagnostics.items():
+            f.write(f"Diagnostics ({collector}):\n")
+            f.write(textwrap.indent(output.strip("\n") + "\n", "> "))
+        f.write("\n----\n\n")
+        return truncated
+
+    def format_for_report(self, name: str, max_log_size: int) -> str:
+        buffer = io.StringIO()
+        if self.write_for_report(buffer, name=name, max_log_size=max_log_size):
+            logging.warning(
+                f"{len(self.full_log)=} is larger than {max_log_size=}, truncate"
+            )
+        return buffer.getvalue()
+
+    def to_dict(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in _FIELDS}
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "CheckResult":
+        """
+        Build a result from the fields in `data`, ignoring other keys (e.g.
+        those of a check in a JSON report).
+        """
+        return cls(**{name: data[name] for name in _FIELDS if name in data})
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    @classmethod
+    def from_json(cls, data: str | bytes) -> "CheckResult":
+        return cls.from_dict(json.loads(data))
+
 
-        return (
-            f"Check: {name}\n"
-            f"Status: {self.status}\n"
-            f"Logs:\n{textwrap.indent(log, '> ')}\n"
-            "----\n\n"
-        )
+_FIELDS = tuple(_field.name for _field in fields(CheckResult))
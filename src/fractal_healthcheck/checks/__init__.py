@@ -1,4 +1,11 @@
+import inspect
+import itertools
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
 from typing import Any
+from typing import Optional
 import yaml
 from fractal_healthcheck.checks import implementations
 import logging
@@ -6,29 +13,303 @@ from fractal_healthcheck import LOGGER_NAME
 from pydantic import BaseModel
 from pydantic import Field
 from pydantic import field_validator
+from pydantic import model_validator
 
 from fractal_healthcheck.checks.CheckResults import CheckResult
+from fractal_healthcheck.checks.diagnostics import COLLECTORS
+from fractal_healthcheck.checks.diagnostics import collect
+from fractal_healthcheck.checks.history import CheckHistory
+from fractal_healthcheck.checks.registry import get_check_function
+from fractal_healthcheck.checks.registry import is_known_check
+from fractal_healthcheck.profiling import Profiler
 
 logger = logging.getLogger(LOGGER_NAME)
 
 
+class RetryPolicy(BaseModel):
+    """
+    Retry a failing check up to `attempts` times in total, waiting
+    `backoff_seconds * backoff_factor**n` (capped to `max_backoff_seconds`,
+    with a random relative `jitter`) between attempts. No new attempt starts
+    if it would exceed `budget_seconds` since the first one.
+    """
+
+    attempts: int = Field(default=1, ge=1)
+    backoff_seconds: float = Field(default=1.0, ge=0)
+    backoff_factor: float = Field(default=2.0, ge=1)
+    max_backoff_seconds: float = Field(default=60.0, ge=0)
+    jitter: float = Field(default=0.1, ge=0, le=1)
+    budget_seconds: float | None = Field(default=None, gt=0)
+
+    def backoff(self, attempt: int) -> float:
+        """
+        Waiting time after the failure of the `attempt`-th attempt (from 1).
+        """
+        delay = min(
+            self.backoff_seconds * self.backoff_factor ** (attempt - 1),
+            self.max_backoff_seconds,
+        )
+        return delay * (1 + random.uniform(-self.jitter, self.jitter))
+
+
+class TrendSettings(BaseModel):
+    """
+    Trend detection over the history of a check `metric` (requires the
+    `history_file` general setting, and the `trends` extra). The check fails
+    if the metric is forecast to reach `limit` within `min_hours_to_limit`
+    hours (by linear extrapolation over the last `window` values, from their
+    EWMA level), or if its last value has a z-score above `max_zscore` with
+    respect to the previous ones.
+    """
+
+    metric: str
+    limit: float | None = None
+    min_hours_to_limit: float | None = Field(default=None, gt=0)
+    max_zscore: float | None = Field(default=None, gt=0)
+    ewma_alpha: float = Field(default=0.3, gt=0, le=1)
+    window: int = Field(default=100, ge=3)
+    min_points: int = Field(default=5, ge=3)
+
+    @model_validator(mode="after")
+    def limit_with_horizon(self):
+        if (self.limit is None) != (self.min_hours_to_limit is None):
+            raise ValueError("Set both or none of limit and min_hours_to_limit.")
+        return self
+
+
+class DiagnosticsSettings(BaseModel):
+    """
+    Diagnostic collectors (among `diagnostics.COLLECTORS`) to run when the
+    check fails, in parallel and within `timeout_seconds`. The output of
+    each collector is capped to `max_output_bytes`, and attached to the
+    check result. Collectors are given as a list of names, or as a mapping
+    from names to kwargs (which must match the collector signature).
+    """
+
+    collectors: dict[str, dict[str, Any]]
+    timeout_seconds: float = Field(default=10.0, gt=0)
+    max_output_bytes: int = Field(default=10_000, gt=0)
+
+    @field_validator("collectors", mode="before")
+    @classmethod
+    def names_to_mapping(cls, value: Any) -> Any:
+        if isinstance(value, list):
+            return {name: {} for name in value}
+        return value
+
+    @field_validator("collectors")
+    @classmethod
+    def known_collectors(
+        cls, value: dict[str, dict[str, Any]]
+    ) -> dict[str, dict[str, Any]]:
+        if not value:
+            raise ValueError("No diagnostic collectors.")
+        unknown = sorted(set(value) - set(COLLECTORS))
+        if unknown:
+            raise ValueError(
+                f"Unknown diagnostic collectors {unknown}, "
+                f"available ones are {list(COLLECTORS)}."
+            )
+        for name, kwargs in value.items():
+            try:
+                # Time and output budgets are passed by `collect`
+                inspect.signature(COLLECTORS[name]).bind(None, None, **kwargs)
+            except TypeError as e:
+                raise ValueError(
+                    f"Invalid kwargs for diagnostic collector '{name}': {e}"
+                )
+        return value
+
+
 class Check(BaseModel):
     name: str
     function_name: str
     kwargs: dict[str, Any] = Field(default_factory=dict)
+    depends_on: list[str] = Field(default_factory=list)
+    retry: RetryPolicy | None = None
+    trend: TrendSettings | None = None
+    diagnostics: DiagnosticsSettings | None = None
     result: CheckResult | None = None
 
+    @field_validator("function_name")
+    @classmethod
+    def known_function(cls, value: str) -> str:
+        if not is_known_check(value):
+            raise ValueError(
+                f"Unknown check function '{value}' (neither built-in nor "
+                "registered as a plugin)."
+            )
+        return value
+
     @property
     def _function(self):
-        return getattr(implementations, self.function_name)
+        return get_check_function(self.function_name)
+
+    def execute(self) -> CheckResult:
+        if self.retry is None:
+            return self._function(**self.kwargs)
+
+        t_start = time.perf_counter()
+        attempt = 1
+        while True:
+            try:
+                result = self._function(**self.kwargs)
+            except Exception as e:
+                result = CheckResult(exception=e, success=False)
+            result.attempts = attempt
+            if result.success or attempt == self.retry.attempts:
+                return result
+            delay = self.retry.backoff(attempt)
+            elapsed = time.perf_counter() - t_start
+            budget = self.retry.budget_seconds
+            if budget is not None and elapsed + delay > budget:
+                logger.info(f"['{self.name}'] Retry budget exhausted.")
+                return result
+            attempt += 1
+            logger.info(f"['{self.name}'] Attempt {attempt} in {delay:.2f} seconds.")
+            time.sleep(delay)
 
     def run(self):
-        self.result = self._function(**self.kwargs)
+        self.result = self.execute()
+
+
+def dependency_waves(checks: list[Check]) -> list[list[Check]]:
+    """
+    Group checks in topological waves: each check only depends on checks
+    from previous waves. Within a wave, the original order is kept.
+
+    Raises `ValueError` for unknown dependencies or dependency cycles.
+    """
+    names = {_check.name for _check in checks}
+    dependents = {_check.name: [] for _check in checks}
+    num_pending_deps = {}
+    for _check in checks:
+        unknown = sorted(set(_check.depends_on) - names)
+        if unknown:
+            raise ValueError(
+                f"Check '{_check.name}' depends on unknown checks: {unknown}."
+            )
+        for dep in set(_check.depends_on):
+            dependents[dep].append(_check.name)
+        num_pending_deps[_check.name] = len(set(_check.depends_on))
+
+    waves = []
+    num_sorted = 0
+    current = [_check for _check in checks if num_pending_deps[_check.name] == 0]
+    while current:
+        waves.append(current)
+        num_sorted += len(current)
+        next_names = set()
+        for _check in current:
+            for name in dependents[_check.name]:
+                num_pending_deps[name] -= 1
+                if num_pending_deps[name] == 0:
+                    next_names.add(name)
+        current = [_check for _check in checks if _check.name in next_names]
+
+    if num_sorted < len(checks):
+        in_cycle = [name for name, num in num_pending_deps.items() if num > 0]
+        raise ValueError(f"Cycle in check dependencies, involving: {in_cycle}.")
+    return waves
+
+
+def expand_matrix(template: dict[str, Any]) -> list[Check]:
+    """
+    Expand a check template with a `matrix` of kwargs values into one check
+    per combination. The `name` and `depends_on` entries are formatted with
+    the kwargs of each combination (e.g. `"Storage usage in {mountpoint}"`);
+    a name without placeholders gets the combination appended.
+
+    The template is validated once, and each check is a copy of it.
+    """
+    template = dict(template)
+    matrix = template.pop("matrix")
+    if not isinstance(matrix, dict) or not matrix:
+        raise ValueError(f"Invalid matrix for check '{template.get('name')}'.")
+    keys = list(matrix.keys())
+    for key in keys:
+        if not isinstance(matrix[key], list):
+            raise ValueError(
+                f"Matrix entry '{key}' of check '{template.get('name')}' is not a list."
+            )
+    base = Check(**template)
+    checks = []
+    for values in itertools.product(*(matrix[key] for key in keys)):
+        combination = dict(zip(keys, values))
+        try:
+            if "{" in base.name:
+                name = base.name.format(**combination)
+            else:
+                suffix = ", ".join(f"{k}={v}" for k, v in combination.items())
+                name = f"{base.name} [{suffix}]"
+            depends_on = [dep.format(**combination) for dep in base.depends_on]
+        except (KeyError, IndexError) as e:
+            raise ValueError(
+                f"Placeholder {e} of check '{base.name}' is not a matrix key "
+                f"(matrix keys: {keys})."
+            )
+        checks.append(
+            base.model_copy(
+                update=dict(
+                    name=name,
+                    kwargs={**base.kwargs, **combination},
+                    depends_on=depends_on,
+                )
+            )
+        )
+    return checks
+
+
+def _batch_units(checks: list[Check], batch: bool = True) -> list[list[Check]]:
+    """
+    Group checks into units of work: checks with the same function and a
+    batch implementation (and no retry policy) form a single unit, all
+    others run on their own. With `batch=False`, all checks run on their own.
+    """
+    if not batch:
+        return [[_check] for _check in checks]
+    units = []
+    batches = {}
+    for _check in checks:
+        if (
+            _check.function_name in implementations.BATCH_FUNCTIONS
+            and _check.retry is None
+        ):
+            if _check.function_name not in batches:
+                batches[_check.function_name] = []
+                units.append(batches[_check.function_name])
+            batches[_check.function_name].append(_check)
+        else:
+            units.append([_check])
+    return units
+
+
+def _lpt_key(history: CheckHistory, names: list[str]) -> float:
+    total = 0.0
+    for name in names:
+        expected_duration = history.expected_duration(name)
+        if expected_duration is None:
+            return -float("inf")
+        total += expected_duration
+    return -total
 
 
 class CheckSuite(BaseModel):
     checks: list[Check]
 
+    @model_validator(mode="before")
+    @classmethod
+    def expand_matrices(cls, data: Any) -> Any:
+        if not isinstance(data, dict) or not isinstance(data.get("checks"), list):
+            return data
+        checks = []
+        for item in data["checks"]:
+            if isinstance(item, dict) and "matrix" in item:
+                checks.extend(expand_matrix(item))
+            else:
+                checks.append(item)
+        return {**data, "checks": checks}
+
     @field_validator("checks", mode="after")
     @classmethod
     def unique_names(cls, value: list[Check]) -> list[Check]:
@@ -37,12 +318,189 @@ class CheckSuite(BaseModel):
             raise ValueError(f"Non-unique list of check names: {names}.")
         return value
 
-    def run(self):
-        for _check in self.checks:
-            logger.info(f"['{_check.name}'] START")
-            _check.run()
-            logger.debug(_check.result)
-            logger.info(f"['{_check.name}'] END")
+    @field_validator("checks", mode="after")
+    @classmethod
+    def acyclic_dependencies(cls, value: list[Check]) -> list[Check]:
+        dependency_waves(value)
+        return value
+
+    @staticmethod
+    def _run_check(_check: Check, profiler: Optional[Profiler] = None) -> CheckResult:
+        logger.info(f"['{_check.name}'] START")
+        t_start = time.perf_counter()
+        try:
+            if profiler is None:
+                result = _check.execute()
+            else:
+                with profiler.section(f"check {_check.name}", group="checks"):
+                    result = _check.execute()
+        except Exception as e:
+            result = CheckResult(exception=e, success=False)
+        result.runtime = time.perf_counter() - t_start
+        logger.debug(result)
+        logger.info(f"['{_check.name}'] END")
+        return result
+
+    @staticmethod
+    def _run_batch(
+        checks: list[Check], profiler: Optional[Profiler] = None
+    ) -> list[CheckResult]:
+        function_name = checks[0].function_name
+        logger.info(f"[{function_name}] START batch of {len(checks)} checks")
+        t_start = time.perf_counter()
+        try:
+            batch_function = implementations.BATCH_FUNCTIONS[function_name]
+            kwargs_list = [_check.kwargs for _check in checks]
+            if profiler is None:
+                results = batch_function(kwargs_list)
+            else:
+                with profiler.section(f"batch {function_name}", group="checks"):
+                    results = batch_function(kwargs_list)
+            if len(results) != len(checks):
+                raise ValueError(
+                    f"Batch '{function_name}' returned {len(results)} results "
+                    f"for {len(checks)} checks."
+                )
+        except Exception as e:
+            results = [CheckResult(exception=e, success=False) for _ in checks]
+        # The batch runtime is split evenly, for the history-based scheduling
+        runtime = (time.perf_counter() - t_start) / len(checks)
+        for result in results:
+            result.runtime = runtime
+        logger.info(f"[{function_name}] END batch of {len(checks)} checks")
+        return results
+
+    def _run_unit(
+        self, unit: list[Check], profiler: Optional[Profiler] = None
+    ) -> list[CheckResult]:
+        if len(unit) == 1:
+            results = [self._run_check(unit[0], profiler=profiler)]
+        else:
+            results = self._run_batch(unit, profiler=profiler)
+        # Diagnostics are collected right after a failure, while the state
+        # that caused it may still be there
+        for _check, result in zip(unit, results):
+            if _check.diagnostics is not None and not result.success:
+                logger.info(f"['{_check.name}'] Collecting diagnostics.")
+                result.diagnostics = collect(
+                    _check.diagnostics.collectors,
+                    timeout_seconds=_check.diagnostics.timeout_seconds,
+                    max_output_bytes=_check.diagnostics.max_output_bytes,
+                )
+        return results
+
+    def run(
+        self,
+        max_workers: int = 1,
+        profiler: Optional[Profiler] = None,
+        deadline_seconds: Optional[float] = None,
+        history: Optional[CheckHistory] = None,
+    ):
+        """
+        Run all checks, in topological waves of their dependencies. Checks
+        within a wave run either serially (`max_workers=1`) or with a pool of
+        `max_workers` threads; in the latter case, checks with the longest
+        duration in `history` start first. Checks with a non-passing
+        dependency are marked as skipped, without running them. Checks of
+        the same wave and function which have a batch implementation run in
+        a single batched call, unless `deadline_seconds` is set.
+
+        When `deadline_seconds` is set, checks that did not complete within
+        this time budget (since the start of the run) are marked as timed
+        out. Checks which are still running cannot be interrupted: they keep
+        running in the background, but their result is discarded.
+
+        When a `profiler` is given, each check is profiled in its own section,
+        checks always run serially and `deadline_seconds` is ignored.
+        """
+        if profiler is not None and max_workers > 1:
+            logger.warning("Profiling is enabled, checks will run serially.")
+            max_workers = 1
+        if profiler is not None and deadline_seconds is not None:
+            # A timed-out check would keep its profiling section active in a
+            # worker thread, preventing any other profiling section
+            logger.warning("Profiling is enabled, the deadline is ignored.")
+            deadline_seconds = None
+        t_start = time.perf_counter()
+        deadline = None if deadline_seconds is None else t_start + deadline_seconds
+        # With a deadline, checks always run in worker threads, so that the
+        # main thread can stop waiting for them
+        if max_workers > 1 or deadline is not None:
+            executor = ThreadPoolExecutor(max_workers=max_workers)
+        else:
+            executor = None
+
+        checks_by_name = {_check.name: _check for _check in self.checks}
+        try:
+            for wave in dependency_waves(self.checks):
+                to_run = []
+                for _check in wave:
+                    if deadline is not None and time.perf_counter() >= deadline:
+                        _check.result = CheckResult(
+                            log=f"Not started within the deadline of {deadline_seconds} seconds.",
+                            success=False,
+                            timed_out=True,
+                        )
+                        continue
+                    failed_deps = [
+                        dep
+                        for dep in _check.depends_on
+                        if not checks_by_name[dep].result.success
+                    ]
+                    if failed_deps:
+                        logger.info(f"['{_check.name}'] SKIPPED")
+                        _check.result = CheckResult(
+                            log=f"Skipped, since these checks did not pass: {failed_deps}",
+                            success=False,
+                            skipped=True,
+                        )
+                    else:
+                        to_run.append(_check)
+
+                # With a deadline, a batch would time out as a whole, also
+                # discarding the results of its checks which completed
+                units = _batch_units(to_run, batch=deadline is None)
+                if executor is None:
+                    for unit in units:
+                        results = self._run_unit(unit, profiler=profiler)
+                        for _check, result in zip(unit, results):
+                            _check.result = result
+                    continue
+
+                if history is not None and max_workers > 1:
+                    # Longest-processing-time-first, with unknown durations first
+                    units.sort(
+                        key=lambda unit: _lpt_key(
+                            history, [_check.name for _check in unit]
+                        )
+                    )
+                t_wave_start = time.perf_counter()
+                futures = {
+                    executor.submit(self._run_unit, unit, profiler): unit
+                    for unit in units
+                }
+                timeout = None
+                if deadline is not None:
+                    timeout = max(deadline - time.perf_counter(), 0)
+                done, not_done = wait(futures, timeout=timeout)
+                for future in done:
+                    for _check, result in zip(futures[future], future.result()):
+                        _check.result = result
+                for future in not_done:
+                    if future.cancel():
+                        log = f"Not started within the deadline of {deadline_seconds} seconds."
+                        runtime = None
+                    else:
+                        log = f"Not completed within the deadline of {deadline_seconds} seconds."
+                        runtime = time.perf_counter() - t_wave_start
+                    for _check in futures[future]:
+                        logger.warning(f"['{_check.name}'] TIMEOUT")
+                        _check.result = CheckResult(
+                            log=log, success=False, timed_out=True, runtime=runtime
+                        )
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=False, cancel_futures=True)
 
     @property
     def any_failing(self) -> bool:
@@ -0,0 +1,222 @@
+import subprocess
+import threading
+from typing import IO
+from typing import Iterator
+from typing import Optional
+
+CHUNK_SIZE = 64 * 1024
+DEFAULT_HEAD_BYTES = 10_000
+DEFAULT_TAIL_BYTES = 10_000
+
+
+class BoundedOutput:
+    """
+    Keep the first `head_bytes` and the last `tail_bytes` of a byte stream,
+    together with the total number of bytes and lines.
+
+    With `keep_output=False`, only the counters are updated.
+    """
+
+    def __init__(
+        self,
+        head_bytes: int = DEFAULT_HEAD_BYTES,
+        tail_bytes: int = DEFAULT_TAIL_BYTES,
+        keep_output: bool = True,
+    ):
+        self.head_bytes = head_bytes
+        self.tail_bytes = tail_bytes
+        self.keep_output = keep_output
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total_bytes = 0
+        self._newlines = 0
+        self._last_byte = b""
+
+    def feed(self, chunk: bytes):
+        if not chunk:
+            return
+        self.total_bytes += len(chunk)
+        self._newlines += chunk.count(b"\n")
+        self._last_byte = chunk[-1:]
+        if not self.keep_output:
+            return
+        missing_head = self.head_bytes - len(self.head)
+        if missing_head > 0:
+            self.head += chunk[:missing_head]
+            chunk = chunk[missing_head:]
+        if chunk and self.tail_bytes > 0:
+            # Ring-buffer behavior: append, then drop what exceeds the size
+            self.tail += chunk[-self.tail_bytes :]
+            excess = len(self.tail) - self.tail_bytes
+            if excess > 0:
+                del self.tail[:excess]
+
+    def consume(self, stream: IO[bytes]):
+        """
+        Read `stream` until EOF, in fixed-size chunks.
+        """
+        while True:
+            chunk = stream.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            self.feed(chunk)
+
+    @property
+    def total_lines(self) -> int:
+        """
+        Number of lines, where a trailing line without newline also counts.
+        """
+        if self._last_byte not in (b"", b"\n"):
+            return self._newlines + 1
+        return self._newlines
+
+    @property
+    def omitted_bytes(self) -> int:
+        if not self.keep_output:
+            return self.total_bytes
+        return self.total_bytes - len(self.head) - len(self.tail)
+
+    @property
+    def truncated(self) -> bool:
+        return self.omitted_bytes > 0
+
+    @property
+    def text(self) -> str:
+        """
+        Decoded output, with a marker in place of the omitted bytes.
+        """
+        head = self.head.decode("utf-8", errors="replace")
+        if not self.truncated:
+            return head + self.tail.decode("utf-8", errors="replace")
+        return (
+            f"{head}\n"
+            f"[... {self.omitted_bytes} bytes omitted, "
+            f"{self.total_bytes} bytes and {self.total_lines} lines in total ...]\n"
+            f"{self.tail.decode('utf-8', errors='replace')}"
+        )
+
+
+class CapturedProcess:
+    """
+    Outcome of `capture_run`, similar to `subprocess.CompletedProcess`.
+    """
+
+    def __init__(
+        self,
+        args: list[str],
+        returncode: int,
+        stdout: BoundedOutput,
+        stderr: BoundedOutput,
+    ):
+        self.args = args
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+
+
+def capture_run(
+    args: list[str],
+    *,
+    check: bool = False,
+    timeout: Optional[float] = None,
+    stdin: Optional[IO] = None,
+    head_bytes: int = DEFAULT_HEAD_BYTES,
+    tail_bytes: int = DEFAULT_TAIL_BYTES,
+    keep_output: bool = True,
+) -> CapturedProcess:
+    """
+    Run a command and stream its stdout/stderr into `BoundedOutput` buffers,
+    so that memory usage does not depend on the size of the output.
+
+    Errors are raised as in `subprocess.run`: `subprocess.TimeoutExpired`
+    when `timeout` is exceeded (the child is killed) and, with `check=True`,
+    `subprocess.CalledProcessError` for a non-zero exit code. Both carry
+    the bounded (decoded) output.
+    """
+    stdout = BoundedOutput(head_bytes, tail_bytes, keep_output=keep_output)
+    stderr = BoundedOutput(head_bytes, tail_bytes)
+
+    with subprocess.Popen(
+        args,
+        stdin=stdin,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    ) as proc:
+        # One reader per pipe, so that a full stderr cannot block stdout
+        readers = [
+            threading.Thread(target=stdout.consume, args=(proc.stdout,), daemon=True),
+            threading.Thread(target=stderr.consume, args=(proc.stderr,), daemon=True),
+        ]
+        for reader in readers:
+            reader.start()
+        try:
+            returncode = proc.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            proc.kill()
+            proc.wait()
+            for reader in readers:
+                reader.join()
+            raise subprocess.TimeoutExpired(
+                args, timeout, output=stdout.text, stderr=stderr.text
+            )
+        for reader in readers:
+            reader.join()
+
+    if check and returncode != 0:
+        raise subprocess.CalledProcessError(
+            returncode, args, output=stdout.text, stderr=stderr.text
+        )
+    return CapturedProcess(
+        args=args, returncode=returncode, stdout=stdout, stderr=stderr
+    )
+
+
+def stream_lines(
+    args: list[str],
+    *,
+    timeout: Optional[float] = None,
+    tail_bytes: int = DEFAULT_TAIL_BYTES,
+) -> Iterator[str]:
+    """
+    Run a command and yield its stdout lines (decoded, without newline) as
+    they are produced, so that the caller can aggregate them without
+    keeping the whole output. Stderr goes to a bounded buffer.
+
+    Once all lines are consumed, errors are raised as in `capture_run` with
+    `check=True`. The `timeout` applies to the whole run.
+    """
+    stderr = BoundedOutput(head_bytes=0, tail_bytes=tail_bytes)
+    with subprocess.Popen(
+        args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    ) as proc:
+        reader = threading.Thread(
+            target=stderr.consume, args=(proc.stderr,), daemon=True
+        )
+        reader.start()
+        timed_out = threading.Event()
+
+        def _kill():
+            timed_out.set()
+            proc.kill()
+
+        timer = None
+        if timeout is not None:
+            timer = threading.Timer(timeout, _kill)
+            timer.start()
+        try:
+            for line in proc.stdout:
+                yield line.decode("utf-8", errors="replace").rstrip("\n")
+            returncode = proc.wait()
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if proc.poll() is None:
+                proc.kill()
+            proc.wait()
+            reader.join()
+        if timed_out.is_set():
+            raise subprocess.TimeoutExpired(args, timeout, stderr=stderr.text)
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, args, stderr=stderr.text)
@@ -0,0 +1,163 @@
+import logging
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
+from typing import Any
+from typing import Callable
+from typing import Optional
+
+import psutil
+
+from fractal_healthcheck import LOGGER_NAME
+from fractal_healthcheck.checks.CheckResults import render_exception
+from fractal_healthcheck.checks.capture import capture_run
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+def _command_output(
+    args: list[str], timeout: float, max_bytes: int, keep_tail: bool
+) -> str:
+    res = capture_run(
+        args,
+        check=True,
+        timeout=timeout,
+        head_bytes=0 if keep_tail else max_bytes,
+        tail_bytes=max_bytes if keep_tail else 0,
+    )
+    return res.stdout.text
+
+
+def dmesg(timeout: float, max_bytes: int) -> str:
+    """
+    Last kernel messages.
+    """
+    return _command_output(["dmesg", "--ctime"], timeout, max_bytes, keep_tail=True)
+
+
+def mounts(timeout: float, max_bytes: int) -> str:
+    """
+    Mount table, from `/proc/mounts`.
+    """
+    with open(os.path.join(psutil.PROCFS_PATH, "mounts"), "r") as f:
+        return f.read(max_bytes)
+
+
+def df_inodes(timeout: float, max_bytes: int) -> str:
+    """
+    Inode usage of all filesystems.
+    """
+    return _command_output(["df", "-i"], timeout, max_bytes, keep_tail=False)
+
+
+def journal_errors(
+    timeout: float,
+    max_bytes: int,
+    since: str = "1 hour ago",
+    units: Optional[list[str]] = None,
+) -> str:
+    """
+    Journal entries with priority `err` or higher, since `since`.
+    """
+    args = ["journalctl", "--no-pager", "--priority=err", f"--since={since}"]
+    for unit in units or []:
+        args.append(f"--unit={unit}")
+    return _command_output(args, timeout, max_bytes, keep_tail=True)
+
+
+def postgres_activity(
+    timeout: float,
+    max_bytes: int,
+    dbname: str,
+    user: Optional[str] = None,
+    password: Optional[str] = None,
+    host: str = "localhost",
+    port: int = 5432,
+) -> str:
+    """
+    Non-idle sessions from `pg_stat_activity`, longest-running first.
+    """
+    import psycopg
+
+    conn_params = {
+        "dbname": dbname,
+        "user": user,
+        "password": password,
+        "host": host,
+        "port": port,
+    }
+    conn_params = {k: v for k, v in conn_params.items() if v is not None}
+    query = """
+        SELECT pid, usename, state, wait_event_type, wait_event,
+               now() - query_start AS duration, left(query, 200)
+        FROM pg_stat_activity
+        WHERE state IS DISTINCT FROM 'idle' AND pid <> pg_backend_pid()
+        ORDER BY query_start
+    """
+    with psycopg.connect(
+        connect_timeout=max(math.ceil(timeout), 1),
+        options=f"-c statement_timeout={int(timeout * 1000)}",
+        **conn_params,
+    ) as connection:
+        rows = connection.execute(query).fetchall()
+    lines = [" | ".join(str(value) for value in row) for row in rows]
+    return "\n".join([f"{len(rows)} non-idle sessions", *lines])[:max_bytes]
+
+
+# A collector gets its time and output budgets (plus its own kwargs), and
+# returns its output as text
+COLLECTORS: dict[str, Callable[..., str]] = {
+    "dmesg": dmesg,
+    "mounts": mounts,
+    "df_inodes": df_inodes,
+    "journal_errors": journal_errors,
+    "postgres_activity": postgres_activity,
+}
+
+
+def collect(
+    collectors: dict[str, dict[str, Any]],
+    timeout_seconds: float,
+    max_output_bytes: int,
+) -> dict[str, str]:
+    """
+    Run all `collectors` (name and kwargs) in parallel, and return their
+    outputs. Commands are killed when exceeding `timeout_seconds`, and any
+    collector which did not finish by then is reported as timed out,
+    without waiting for it. Each output is capped to `max_output_bytes`.
+    Errors become part of the output.
+    """
+    t_start = time.perf_counter()
+    executor = ThreadPoolExecutor(max_workers=len(collectors))
+    try:
+        futures = {
+            name: executor.submit(
+                COLLECTORS[name],
+                timeout=timeout_seconds,
+                max_bytes=max_output_bytes,
+                **kwargs,
+            )
+            for name, kwargs in collectors.items()
+        }
+        wait(futures.values(), timeout=timeout_seconds)
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    outputs = {}
+    for name, future in futures.items():
+        if not future.done():
+            output = f"[Not completed within {timeout_seconds} seconds]"
+        elif future.exception() is not None:
+            output = f"[{render_exception(future.exception())}]"
+        else:
+            output = future.result().strip("\n")
+            if len(output) > max_output_bytes:
+                output = f"[TRUNCATED]\n{output[-max_output_bytes:]}"
+        outputs[name] = output
+    logger.info(
+        f"Collected diagnostics {list(collectors)} in "
+        f"{time.perf_counter() - t_start:.2f} seconds."
+    )
+    return outputs
@@ -0,0 +1,111 @@
+import json
+import logging
+import statistics
+import time
+
+from fractal_healthcheck import LOGGER_NAME
+from fractal_healthcheck.checks.CheckResults import CheckResult
+from fractal_healthcheck.utils import atomic_write
+
+logger = logging.getLogger(LOGGER_NAME)
+
+MAX_HISTORY_LENGTH = 20
+
+
+class CheckHistory:
+    """
+    Per-check history of previous runs, stored as JSON. Recent durations
+    are used to schedule the slowest checks first; recent retry outcomes
+    (whether a run only passed after a retry) give a flakiness rate.
+    The values of metrics used for trend detection are kept for as many
+    runs as the trend window.
+    """
+
+    checks: dict[str, dict]
+
+    def __init__(self, checks: dict[str, dict] | None = None):
+        self.checks = checks or {}
+
+    @classmethod
+    def from_file(cls, filename: str) -> "CheckHistory":
+        """
+        Load history from `filename`, or start from scratch if it cannot
+        be read.
+        """
+        try:
+            with open(filename, "r") as f:
+                return cls(checks=json.load(f)["checks"])
+        except Exception as e:
+            logger.info(
+                f"[CheckHistory] Cannot read '{filename}', original error: {e}."
+            )
+            return cls()
+
+    def to_file(self, filename: str):
+        atomic_write(filename, json.dumps({"checks": self.checks}))
+
+    def expected_duration(self, name: str) -> float | None:
+        """
+        Mean of the recent durations of a check, if any.
+        """
+        durations = self.checks.get(name, {}).get("durations")
+        if not durations:
+            return None
+        return statistics.fmean(durations)
+
+    def flakiness(self, name: str) -> float | None:
+        """
+        Fraction of recent runs of a check which only passed after a retry.
+        """
+        flaky = self.checks.get(name, {}).get("flaky")
+        if not flaky:
+            return None
+        return statistics.fmean(flaky)
+
+    def metric_series(self, name: str, metric: str) -> tuple[list, list]:
+        """
+        Times (UNIX timestamps) and values of a metric of a check.
+        """
+        series = self.checks.get(name, {}).get("metrics", {}).get(metric, {})
+        return series.get("times", []), series.get("values", [])
+
+    def update(
+        self,
+        results: dict[str, CheckResult | None],
+        tracked_metrics: dict[str, tuple[str, int]] | None = None,
+    ):
+        """
+        Record the duration and retry outcome of each check which has
+        actually run, and set the updated flakiness rate on its result.
+
+        For checks in `tracked_metrics`, also record the value of the given
+        metric, keeping the given number of values. Other metrics are not
+        stored, so that the file size does not grow with the number of
+        metrics reported by checks.
+        """
+        now = round(time.time(), 3)
+        tracked_metrics = tracked_metrics or {}
+        for name, result in results.items():
+            if result is None or result.runtime is None:
+                continue
+            history = self.checks.setdefault(name, {})
+            durations = history.setdefault("durations", [])
+            durations.append(round(result.runtime, 4))
+            del durations[:-MAX_HISTORY_LENGTH]
+            flaky = history.setdefault("flaky", [])
+            flaky.append(int(result.success and result.attempts > 1))
+            del flaky[:-MAX_HISTORY_LENGTH]
+            result.flakiness = self.flakiness(name)
+            if name not in tracked_metrics:
+                history.pop("metrics", None)
+                continue
+            metric, max_length = tracked_metrics[name]
+            previous = history.get("metrics", {}).get(metric)
+            series = previous or {"times": [], "values": []}
+            # Drop series of metrics which are no longer tracked
+            history["metrics"] = {metric: series}
+            if metric in result.metrics:
+                series["times"].append(now)
+                series["values"].append(result.metrics[metric])
+                del series["times"][:-max_length]
+                del series["values"][:-max_length]
@@ -1,4 +1,7 @@
 import json
+import os
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 import psutil
 import subprocess
 from datetime import datetime, timezone
@@ -7,8 +10,19 @@ import shlex
 from typing import Optional
 from fabric.connection import Connection
 from urllib3.util import Retry
+from urllib3.util import Timeout
 from urllib3 import PoolManager
 from fractal_healthcheck.checks.CheckResults import CheckResult
+from fractal_healthcheck.checks.capture import capture_run
+from fractal_healthcheck.checks.capture import stream_lines
+from fractal_healthcheck.checks.logscan import LogScanner
+from fractal_healthcheck.checks.network import probe_tcp
+from fractal_healthcheck.checks.processes import take_snapshot
+from fractal_healthcheck.checks.sampling import LoadReader
+from fractal_healthcheck.checks.sampling import MemoryReader
+from fractal_healthcheck.checks.sampling import format_stats
+from fractal_healthcheck.checks.sampling import pressure_reader
+from fractal_healthcheck.checks.sampling import sample
 
 
 def subprocess_run(command: str) -> CheckResult:
@@ -16,26 +30,53 @@ def subprocess_run(command: str) -> CheckResult:
     Generic call to `subprocess.run`
     """
     try:
-        res = subprocess.run(
-            shlex.split(command),
-            check=True,
-            capture_output=True,
-            encoding="utf-8",
-        )
-        return CheckResult(log=res.stdout)
+        res = capture_run(shlex.split(command), check=True)
+        return CheckResult(log=res.stdout.text)
     except Exception as e:
         return CheckResult(exception=e, success=False)
 
 
-def url_json(url: str) -> CheckResult:
+# Retry connection errors, but not read timeouts (which already took the
+# whole `timeout_seconds`)
+URL_JSON_RETRY = Retry(connect=5, read=0)
+
+
+def url_json(url: str, timeout_seconds: float = 10.0) -> CheckResult:
     """
     Log the json-parsed output of a request to 'url'.
+
+    Connection errors are retried; `timeout_seconds` applies to each attempt.
     """
+    return _url_json(PoolManager(retries=URL_JSON_RETRY), url, timeout_seconds)
+
+
+# Maximum number of concurrent requests in `url_json_batch`
+URL_JSON_BATCH_MAX_WORKERS = 16
+
+
+def url_json_batch(kwargs_list: list[dict]) -> list[CheckResult]:
+    """
+    Batched version of `url_json`, sharing a single connection pool so that
+    connections to the same host are reused. Requests are issued
+    concurrently, so that the batch takes as long as its slowest request.
+    """
+    num_workers = min(len(kwargs_list), URL_JSON_BATCH_MAX_WORKERS)
+    http = PoolManager(retries=URL_JSON_RETRY, maxsize=num_workers)
     try:
-        retries = Retry(connect=5)
-        http = PoolManager(retries=retries)
-        response_data = None
-        response = http.request("GET", url)
+        with ThreadPoolExecutor(max_workers=num_workers) as executor:
+            return list(
+                executor.map(lambda kwargs: _url_json(http, **kwargs), kwargs_list)
+            )
+    finally:
+        http.clear()
+
+
+def _url_json(
+    http: PoolManager, url: str, timeout_seconds: float = 10.0
+) -> CheckResult:
+    response_data = None
+    try:
+        response = http.request("GET", url, timeout=Timeout(total=timeout_seconds))
         response_data = response.data.decode("utf-8")
         if response.status == 200:
             data = json.loads(response_data)
@@ -56,31 +97,85 @@ def url_json(url: str) -> CheckResult:
         return CheckResult(log=log, success=False)
 
 
-def system_load(max_load_fraction: float = 0.7) -> CheckResult:
+def system_load(
+    max_load_fraction: float = 0.7,
+    sample_window_seconds: Optional[float] = None,
+    sample_interval_seconds: float = 0.1,
+    snapshot_top_n: int = 5,
+) -> CheckResult:
     """
     Get system load averages, keep only the 5-minute average
-    """
-    load_fraction = psutil.getloadavg()[1] / psutil.cpu_count()
 
+    With `sample_window_seconds`, sample instead the 1-minute load average
+    (and the CPU pressure, if available) over that window, and fail if the
+    95th percentile of the load fraction exceeds the threshold.
+
+    When failing, a snapshot of the top `snapshot_top_n` processes is
+    appended to the log (`snapshot_top_n=0` to disable it).
+    """
     try:
-        log = f"System load: {load_fraction}"
-        return CheckResult(log=log, success=max_load_fraction > load_fraction)
+        if sample_window_seconds is not None:
+            result = _sampled_system_load(
+                max_load_fraction, sample_window_seconds, sample_interval_seconds
+            )
+        else:
+            load_fraction = psutil.getloadavg()[1] / psutil.cpu_count()
+            log = f"System load: {load_fraction}"
+            result = CheckResult(
+                log=log,
+                success=max_load_fraction > load_fraction,
+                metrics={"load_fraction": load_fraction},
+            )
+        return _with_process_snapshot(result, snapshot_top_n)
     except Exception as e:
         return CheckResult(exception=e, success=False)
 
 
+def _sampled_system_load(
+    max_load_fraction: float,
+    sample_window_seconds: float,
+    sample_interval_seconds: float,
+) -> CheckResult:
+    num_cpus = psutil.cpu_count()
+    load = LoadReader()
+    cpu_pressure = pressure_reader("cpu")
+    try:
+        readers = {"load": lambda: load() / num_cpus}
+        if cpu_pressure is not None:
+            readers["cpu_pressure"] = cpu_pressure
+        buffers = sample(readers, sample_window_seconds, sample_interval_seconds)
+    finally:
+        load.close()
+        if cpu_pressure is not None:
+            cpu_pressure.close()
+    load_stats = buffers["load"].stats(threshold=max_load_fraction)
+    lines = [
+        f"System load fraction (1-minute average / {num_cpus} CPUs), "
+        f"{buffers['load'].count} samples over {sample_window_seconds} seconds, "
+        f"threshold {max_load_fraction}:",
+        format_stats("Load fraction", load_stats),
+    ]
+    if cpu_pressure is not None:
+        lines.append(
+            format_stats("CPU pressure (some)", buffers["cpu_pressure"].stats(), "%")
+        )
+    return CheckResult(
+        log="\n".join(lines),
+        success=load_stats["p95"] < max_load_fraction,
+        metrics={
+            "load_fraction": load_stats["mean"],
+            "load_fraction_p95": load_stats["p95"],
+        },
+    )
+
+
 def lsof_count() -> CheckResult:
     """
     Count open files via lsof
     """
     try:
-        res = subprocess.run(
-            shlex.split("lsof -t"),
-            check=True,
-            capture_output=True,
-            encoding="utf-8",
-        )
-        num_lines = len(res.stdout.strip("\n").split("\n"))
+        res = capture_run(shlex.split("lsof -t"), check=True, keep_output=False)
+        num_lines = res.stdout.total_lines
         log = f"Number of open files (via lsof): {num_lines}"
         return CheckResult(log=log)
     except Exception as e:
@@ -128,13 +223,10 @@ def ps_count_with_threads() -> CheckResult:
     Count open processes (including thread)
     """
     try:
-        res = subprocess.run(
-            shlex.split("ps -AL --no-headers"),
-            check=True,
-            capture_output=True,
-            encoding="utf-8",
+        res = capture_run(
+            shlex.split("ps -AL --no-headers"), check=True, keep_output=False
         )
-        num_lines = len(res.stdout.strip("\n").split("\n"))
+        num_lines = res.stdout.total_lines
         log = f"Number of open processes&threads (via ps -AL): {num_lines}"
         return CheckResult(log=log)
     except Exception as e:
@@ -148,11 +240,11 @@ def disk_usage(
     """
     Call psutil.disk_usage on provided 'mountpoint'
     """
-    disk_usage = psutil.disk_usage(mountpoint)
-    tot_gb = round(disk_usage.total / 1e9, 2)
-    used_gb = round(disk_usage.used / 1e9, 2)
-    perc_used = disk_usage.percent
     try:
+        disk_usage = psutil.disk_usage(mountpoint)
+        tot_gb = round(disk_usage.total / 1e9, 2)
+        used_gb = round(disk_usage.used / 1e9, 2)
+        perc_used = disk_usage.percent
         return CheckResult(
             log=(
                 f"The usage of {mountpoint} is {perc_used}% ({used_gb} GB out "
@@ -160,16 +252,36 @@ def disk_usage(
                 f"{max_perc_usage}%."
             ),
             success=perc_used < max_perc_usage,
+            metrics={"percent": perc_used, "used_gb": used_gb},
         )
     except Exception as e:
         return CheckResult(exception=e, success=False)
 
 
-def memory_usage(max_memory_usage: int = 75) -> CheckResult:
+def memory_usage(
+    max_memory_usage: int = 75,
+    sample_window_seconds: Optional[float] = None,
+    sample_interval_seconds: float = 0.1,
+    snapshot_top_n: int = 5,
+) -> CheckResult:
     """
     Memory usage, via psutil.virtual_memory
+
+    With `sample_window_seconds`, sample instead the memory usage (and the
+    memory pressure, if available) over that window, and fail if it ever
+    exceeds the threshold, so that short spikes are not missed.
+
+    When failing, a snapshot of the top `snapshot_top_n` processes is
+    appended to the log (`snapshot_top_n=0` to disable it).
     """
     try:
+        if sample_window_seconds is not None:
+            return _with_process_snapshot(
+                _sampled_memory_usage(
+                    max_memory_usage, sample_window_seconds, sample_interval_seconds
+                ),
+                snapshot_top_n,
+            )
         mem_usage = psutil.virtual_memory()
 
         mem_usage_total = round(mem_usage.total / 1e9, 2)
@@ -180,14 +292,51 @@ def memory_usage(max_memory_usage: int = 75) -> CheckResult:
             "Free memory": f"{mem_usage_available} GB",
             "Percent": f"{mem_usage_percent}%",
         }
-        return CheckResult(
+        result = CheckResult(
             log=f"The memory usage is {mem_usage_percent}%, while the threshold is {max_memory_usage}%\n{json.dumps(log, indent=2)}",
             success=max_memory_usage > mem_usage_percent,
+            metrics={"percent": mem_usage_percent},
         )
+        return _with_process_snapshot(result, snapshot_top_n)
     except Exception as e:
         return CheckResult(exception=e, success=False)
 
 
+def _sampled_memory_usage(
+    max_memory_usage: int,
+    sample_window_seconds: float,
+    sample_interval_seconds: float,
+) -> CheckResult:
+    memory = MemoryReader()
+    memory_pressure = pressure_reader("memory")
+    try:
+        readers = {"memory": memory}
+        if memory_pressure is not None:
+            readers["memory_pressure"] = memory_pressure
+        buffers = sample(readers, sample_window_seconds, sample_interval_seconds)
+    finally:
+        memory.close()
+        if memory_pressure is not None:
+            memory_pressure.close()
+    memory_stats = buffers["memory"].stats(threshold=max_memory_usage)
+    lines = [
+        f"Memory usage, {buffers['memory'].count} samples over "
+        f"{sample_window_seconds} seconds, threshold {max_memory_usage}%:",
+        format_stats("Memory usage", memory_stats, "%"),
+    ]
+    if memory_pressure is not None:
+        lines.append(
+            format_stats(
+                "Memory pressure (some)", buffers["memory_pressure"].stats(), "%"
+            )
+        )
+    return CheckResult(
+        log="\n".join(lines),
+        success=memory_stats["max"] < max_memory_usage,
+        metrics={"percent": memory_stats["mean"], "percent_max": memory_stats["max"]},
+    )
+
+
 def check_mounts(
     mounts: list[str],
     timeout_seconds: int = 600,
@@ -203,14 +352,13 @@ def check_mounts(
 
     try:
         paths = " ".join(mounts)
-        res = subprocess.run(
+        res = capture_run(
             shlex.split(f"ls {paths}"),
             check=True,
-            capture_output=True,
-            encoding="utf-8",
             timeout=timeout_seconds,
+            keep_output=False,
         )
-        num_objs = len(res.stdout.strip("\n").split("\n"))
+        num_objs = res.stdout.total_lines
         log = f"Number of files/folders (via ls {paths}): {num_objs}"
         return CheckResult(log=log)
     except Exception as e:
@@ -231,34 +379,119 @@ def service_logs(
     try:
         logging.info(f"{cmd=}")
 
-        res1 = subprocess.run(
+        # Pipe journalctl directly into grep, so that the (possibly large)
+        # journal output never goes through Python
+        journal = subprocess.Popen(
             shlex.split(cmd),
-            capture_output=True,
-            encoding="utf-8",
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
         )
-        logging.info(f"journalctl returncode: {res1.returncode}")
+        grep_cmd = f'grep -E "{parsed_target_words}"'
+        logging.info(f"{grep_cmd=}")
+        try:
+            res2 = capture_run(shlex.split(grep_cmd), stdin=journal.stdout)
+        finally:
+            journal.stdout.close()
+            journal.wait()
+        logging.info(f"journalctl returncode: {journal.returncode}")
 
-        cmd = f'grep -E "{parsed_target_words}"'
-        logging.info(f"{cmd=}")
-        res2 = subprocess.run(
-            shlex.split(cmd),
-            input=res1.stdout,
-            capture_output=True,
-            encoding="utf-8",
-        )
-        critical_lines = res2.stdout.strip("\n").split("\n")
         if res2.returncode == 1:
             return CheckResult(
-                log=f"Returncode={res2.returncode} for {cmd=}.", success=True
+                log=f"Returncode={res2.returncode} for cmd={grep_cmd!r}.",
+                success=True,
             )
         else:
-            critical_lines_joined = "\n".join(critical_lines)
+            critical_lines_joined = res2.stdout.text.strip("\n")
             log = f"{target_words=}.\nMatching log lines:\n{critical_lines_joined}"
             return CheckResult(log=log, success=False)
     except Exception as e:
         return CheckResult(exception=e, success=False)
 
 
+def log_files(
+    files: list[str],
+    target_words: list[str],
+    state_file: str,
+    max_samples: int = 20,
+    ignore_case: bool = False,
+    scan_existing: bool = False,
+) -> CheckResult:
+    """
+    Search for `target_words` (regular expressions) in the lines appended to
+    log `files` since the previous run, see `LogScanner`. Offsets are kept
+    in `state_file`. Fails if there is any match.
+    """
+    try:
+        scanner = LogScanner(
+            target_words,
+            state_file=state_file,
+            max_samples=max_samples,
+            ignore_case=ignore_case,
+            scan_existing=scan_existing,
+        )
+        scans = scanner.scan(files)
+        lines = []
+        for scan in scans:
+            rotated = ", after rotation" if scan.rotated else ""
+            lines.append(
+                f"{scan.path}: scanned {scan.end_offset - scan.start_offset} bytes "
+                f"(offset {scan.start_offset} to {scan.end_offset}{rotated})."
+            )
+        counts = ", ".join(f"{word!r}: {num}" for word, num in scanner.counts.items())
+        lines.append(f"Matches: {counts}")
+        if scanner.samples:
+            lines.append(f"Matching lines (at most {max_samples}):")
+            lines.extend(scanner.samples)
+        return CheckResult(
+            log="\n".join(lines),
+            success=not any(scanner.counts.values()),
+            metrics={f"matches/{word}": num for word, num in scanner.counts.items()},
+        )
+    except Exception as e:
+        return CheckResult(exception=e, success=False)
+
+
+def tcp_reachability(
+    targets: list[str],
+    timeout_seconds: float = 5.0,
+    max_latency_ms: Optional[float] = None,
+    max_concurrency: int = 256,
+) -> CheckResult:
+    """
+    Check that TCP connections to all `targets` (`host:port`) can be
+    opened, concurrently and within a global `timeout_seconds`. Fails for
+    unreachable targets, or for connection latencies above `max_latency_ms`.
+    """
+    try:
+        results = probe_tcp(
+            targets, timeout_seconds=timeout_seconds, max_concurrency=max_concurrency
+        )
+        rows = []
+        problems = []
+        metrics = {}
+        for result in results:
+            if result.error is not None:
+                problems.append(f"{result.target} is not reachable.")
+                rows.append([result.target, "ERROR", "-", result.error])
+                continue
+            metrics[f"latency_ms/{result.target}"] = round(result.latency_ms, 2)
+            if max_latency_ms is not None and result.latency_ms > max_latency_ms:
+                problems.append(f"{result.target}: latency exceeds {max_latency_ms=}.")
+            rows.append([result.target, "OK", f"{result.latency_ms:.2f}", ""])
+        table = create_table(
+            ["Target", "Status", "Latency ms", "Error"],
+            rows,
+            [max(len(target) for target in targets), 6, 10, 20],
+        )
+        return CheckResult(
+            log="\n".join([table, *problems]),
+            success=not problems,
+            metrics=metrics,
+        )
+    except Exception as e:
+        return CheckResult(exception=e, success=False)
+
+
 def ssh_on_server(
     username: str,
     host: str,
@@ -304,23 +537,34 @@ def ssh_on_server(
         )
 
 
-def service_is_active(services: list[str], use_user: bool = False) -> CheckResult:
-    parsed_services = " ".join(services)
-
+def _systemctl_show(
+    units: list[str], properties: list[str], use_user: bool = False
+) -> list[dict[str, str]]:
+    """
+    Query `properties` of all `units` with a single `systemctl show` call.
+    """
+    cmd = ["systemctl"]
     if use_user:
-        cmd = f"systemctl is-active --user {parsed_services}"
-    else:
-        cmd = f"systemctl is-active {parsed_services}"
+        cmd.append("--user")
+    cmd.extend(["show", f"--property={','.join(properties)}", *units])
+    logging.info(f"{cmd=}")
+    res = capture_run(cmd, check=True)
+    # One block of KEY=VALUE lines per unit, separated by empty lines
+    blocks = []
+    for block in res.stdout.text.strip("\n").split("\n\n"):
+        blocks.append(dict(line.split("=", 1) for line in block.splitlines() if line))
+    if len(blocks) != len(units):
+        raise ValueError(f"Expected {len(units)} units, got {len(blocks)}: {blocks}")
+    return blocks
+
+
+def service_is_active(services: list[str], use_user: bool = False) -> CheckResult:
     try:
-        logging.info(f"{cmd=}")
-        res = subprocess.run(
-            shlex.split(cmd),
-            capture_output=True,
-            encoding="utf-8",
-        )
-        statuses = res.stdout.split("\n")
-        log = dict(zip(services, statuses))
-        if "inactive" in res.stdout or "failed" in res.stdout:
+        blocks = _systemctl_show(services, ["ActiveState"], use_user=use_user)
+        log = {
+            service: block["ActiveState"] for service, block in zip(services, blocks)
+        }
+        if any(status in ("inactive", "failed") for status in log.values()):
             return CheckResult(log=json.dumps(log, indent=2), success=False)
         else:
             return CheckResult(log=json.dumps(log, indent=2))
@@ -328,6 +572,311 @@ def service_is_active(services: list[str], use_user: bool = False) -> CheckResul
         return CheckResult(exception=e, success=False)
 
 
+CGROUP_LIMITS = {
+    "max_memory_mb": "memory_mb",
+    "max_memory_peak_mb": "memory_peak_mb",
+    "max_oom_kills": "oom_kills",
+    "max_pids": "pids",
+}
+
+
+def _read_cgroup_int(path: str) -> int | None:
+    try:
+        with open(path, "rb") as f:
+            return int(f.read())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _read_cgroup_keyed(path: str) -> dict[str, int]:
+    try:
+        with open(path, "rb") as f:
+            return {
+                key.decode(): int(value)
+                for key, value in (line.split() for line in f.read().splitlines())
+            }
+    except FileNotFoundError:
+        return {}
+
+
+def _read_cgroup_stats(cgroup_dir: str) -> dict[str, float | None]:
+    """
+    Resource usage from the cgroup v2 files in `cgroup_dir`; values of
+    missing files (e.g. disabled controllers) are `None`.
+    """
+    memory = _read_cgroup_int(os.path.join(cgroup_dir, "memory.current"))
+    memory_peak = _read_cgroup_int(os.path.join(cgroup_dir, "memory.peak"))
+    memory_events = _read_cgroup_keyed(os.path.join(cgroup_dir, "memory.events"))
+    cpu_stat = _read_cgroup_keyed(os.path.join(cgroup_dir, "cpu.stat"))
+    cpu_usec = cpu_stat.get("usage_usec")
+    return dict(
+        memory_mb=None if memory is None else round(memory / 2**20, 1),
+        memory_peak_mb=None if memory_peak is None else round(memory_peak / 2**20, 1),
+        oom_kills=memory_events.get("oom_kill"),
+        cpu_seconds=None if cpu_usec is None else round(cpu_usec / 1e6, 1),
+        pids=_read_cgroup_int(os.path.join(cgroup_dir, "pids.current")),
+    )
+
+
+def systemd_cgroup_usage(
+    units: list[str],
+    limits: Optional[dict[str, dict[str, float]]] = None,
+    use_user: bool = False,
+    cgroup_root: str = "/sys/fs/cgroup",
+) -> CheckResult:
+    """
+    Resource usage of systemd `units`, read from their cgroup v2 folders
+    (`memory.current`, `memory.peak`, `memory.events`, `cpu.stat` and
+    `pids.current`), after a single `systemctl show` call for their state
+    and cgroup path.
+
+    `limits` maps unit names to thresholds, among `max_memory_mb`,
+    `max_memory_peak_mb`, `max_oom_kills` and `max_pids`. The check fails
+    if a unit is not active, or if any threshold is exceeded.
+    """
+    limits = limits or {}
+    try:
+        for unit, unit_limits in limits.items():
+            unknown = sorted(set(unit_limits) - set(CGROUP_LIMITS))
+            if unit not in units or unknown:
+                raise ValueError(f"Invalid limits for unit '{unit}': {unit_limits}.")
+        blocks = _systemctl_show(
+            units, ["ActiveState", "ControlGroup"], use_user=use_user
+        )
+        rows = []
+        problems = []
+        metrics = {}
+        for unit, block in zip(units, blocks):
+            state = block.get("ActiveState")
+            control_group = block.get("ControlGroup")
+            if state != "active":
+                problems.append(f"{unit} is {state}.")
+            if control_group:
+                stats = _read_cgroup_stats(
+                    os.path.join(cgroup_root, control_group.lstrip("/"))
+                )
+            else:
+                stats = dict.fromkeys(
+                    ["memory_mb", "memory_peak_mb", "oom_kills", "cpu_seconds", "pids"]
+                )
+            for limit_name, limit in limits.get(unit, {}).items():
+                value = stats[CGROUP_LIMITS[limit_name]]
+                if value is not None and value > limit:
+                    problems.append(f"{unit}: {limit_name}={limit} exceeded ({value}).")
+            for key, value in stats.items():
+                if value is not None:
+                    metrics[f"{unit}/{key}"] = value
+            # Strings, since `create_table` shows falsy values (e.g. 0) as "-"
+            rows.append(
+                [unit, state, *("-" if v is None else str(v) for v in stats.values())]
+            )
+        table = create_table(
+            ["Unit", "State", "Memory MB", "Peak MB", "OOM kills", "CPU s", "PIDs"],
+            rows,
+            [max(len(unit) for unit in units), 12, 10, 10, 9, 10, 6],
+        )
+        log = "\n".join([table, *problems])
+        return CheckResult(log=log, success=not problems, metrics=metrics)
+    except Exception as e:
+        return CheckResult(exception=e, success=False)
+
+
+# `sinfo` compact node states, for nodes which cannot run jobs
+UNAVAILABLE_NODE_STATES = ("down", "drain", "drng", "fail", "inval", "unk", "npc")
+
+
+def _format_counter(counter: Counter, top_n: int | None = None) -> str:
+    return ", ".join(f"{key}: {num}" for key, num in counter.most_common(top_n)) or "-"
+
+
+def slurm_status(
+    max_oldest_pending_hours: Optional[float] = 24,
+    max_pending_jobs: Optional[int] = None,
+    max_unavailable_nodes: int = 0,
+    partition: Optional[str] = None,
+    top_n: int = 10,
+    timeout_seconds: int = 60,
+) -> CheckResult:
+    """
+    Summary of the SLURM queue (jobs by state and user, pending reasons,
+    oldest pending job) and nodes (by state, with the unavailable ones),
+    from one `squeue` and one `sinfo` call with compact formats. Their
+    output is aggregated line by line, without keeping it.
+
+    Fails if the oldest pending job is older than `max_oldest_pending_hours`,
+    if there are more than `max_pending_jobs` pending jobs, or if more than
+    `max_unavailable_nodes` nodes are down, drained or not responding.
+    """
+    try:
+        partition_args = [] if partition is None else [f"--partition={partition}"]
+        jobs_by_state = Counter()
+        jobs_by_user = Counter()
+        pending_reasons = Counter()
+        oldest_pending = None
+        for line in stream_lines(
+            [
+                "squeue",
+                "--noheader",
+                "--array",
+                "--format=%T|%u|%r|%V",
+                *partition_args,
+            ],
+            timeout=timeout_seconds,
+        ):
+            state, user, reason, submit_time = line.split("|", 3)
+            jobs_by_state[state] += 1
+            jobs_by_user[user] += 1
+            if state == "PENDING":
+                pending_reasons[reason] += 1
+                submitted = datetime.fromisoformat(submit_time)
+                if oldest_pending is None or submitted < oldest_pending:
+                    oldest_pending = submitted
+
+        nodes_by_state = Counter()
+        unavailable_nodes = {}
+        seen_nodes = set()
+        for line in stream_lines(
+            ["sinfo", "--noheader", "--Node", "--format=%N|%t|%E", *partition_args],
+            timeout=timeout_seconds,
+        ):
+            node, state, reason = line.split("|", 2)
+            # With `--Node`, nodes in several partitions are listed once each
+            if node in seen_nodes:
+                continue
+            seen_nodes.add(node)
+            nodes_by_state[state] += 1
+            if state.endswith("*") or state.startswith(UNAVAILABLE_NODE_STATES):
+                unavailable_nodes[node] = f"{state}, {reason}"
+
+        num_pending = jobs_by_state["PENDING"]
+        problems = []
+        lines = [
+            f"Jobs: {sum(jobs_by_state.values())} ({_format_counter(jobs_by_state)})",
+            f"Top {top_n} users by jobs: {_format_counter(jobs_by_user, top_n)}",
+            f"Pending reasons: {_format_counter(pending_reasons)}",
+        ]
+        metrics = {"jobs": sum(jobs_by_state.values()), "pending_jobs": num_pending}
+        if oldest_pending is not None:
+            pending_hours = (datetime.now() - oldest_pending).total_seconds() / 3600
+            metrics["oldest_pending_hours"] = round(pending_hours, 2)
+            lines.append(
+                f"Oldest pending job: submitted {oldest_pending} "
+                f"({pending_hours:.1f} hours ago)"
+            )
+            if (
+                max_oldest_pending_hours is not None
+                and pending_hours > max_oldest_pending_hours
+            ):
+                problems.append(
+                    f"Oldest pending job exceeds {max_oldest_pending_hours=}."
+                )
+        if max_pending_jobs is not None and num_pending > max_pending_jobs:
+            problems.append(f"{num_pending} pending jobs exceed {max_pending_jobs=}.")
+
+        lines.append(
+            f"Nodes: {sum(nodes_by_state.values())} ({_format_counter(nodes_by_state)})"
+        )
+        metrics["unavailable_nodes"] = len(unavailable_nodes)
+        if unavailable_nodes:
+            lines.append("Unavailable nodes:")
+            lines.extend(
+                f" * {node} ({info})" for node, info in unavailable_nodes.items()
+            )
+        if len(unavailable_nodes) > max_unavailable_nodes:
+            problems.append(
+                f"{len(unavailable_nodes)} unavailable nodes exceed "
+                f"{max_unavailable_nodes=}."
+            )
+        log = "\n".join([*lines, *problems])
+        return CheckResult(log=log, success=not problems, metrics=metrics)
+    except Exception as e:
+        return CheckResult(exception=e, success=False)
+
+
+def _format_process_snapshot(top_n: int) -> str:
+    snapshot = take_snapshot(top_n=top_n)
+    lines = [f"Number of processes: {snapshot.num_processes}"]
+    headers = [
+        "PID",
+        "Name",
+        "User",
+        "RSS MB",
+        "CPU s",
+        "FDs",
+        "Threads",
+        "Fractal job",
+        "SLURM job",
+    ]
+    column_widths = [8, 16, 12, 9, 9, 6, 7, 11, 9]
+    for key, title in (
+        ("rss_mb", "RSS"),
+        ("cpu_seconds", "CPU time"),
+        ("num_fds", "file descriptors"),
+        ("num_threads", "threads"),
+    ):
+        rows = [
+            [
+                p.pid,
+                p.name,
+                p.username,
+                f"{p.rss_mb:.1f}",
+                f"{p.cpu_seconds:.1f}",
+                str(p.num_fds),
+                str(p.num_threads),
+                p.fractal_job,
+                snapshot.slurm_jobs.get(p.pid),
+            ]
+            for p in snapshot.top[key]
+        ]
+        lines.append(f"\n== Top {top_n} processes by {title} ==")
+        lines.append(create_table(headers, rows, column_widths))
+    for title, groups in (
+        ("users", snapshot.by_user),
+        ("Fractal jobs", snapshot.by_fractal_job),
+    ):
+        if not groups:
+            continue
+        top_groups = sorted(groups.items(), key=lambda item: -item[1][1])[:top_n]
+        lines.append(f"\n== Top {top_n} {title} by RSS ==")
+        lines.append(
+            create_table(
+                [title.capitalize(), "Processes", "RSS MB", "CPU s"],
+                [
+                    [key, str(num), f"{rss_mb:.1f}", f"{cpu_seconds:.1f}"]
+                    for key, (num, rss_mb, cpu_seconds) in top_groups
+                ],
+                [12, 9, 10, 10],
+            )
+        )
+    return "\n".join(lines)
+
+
+def _with_process_snapshot(result: CheckResult, top_n: int) -> CheckResult:
+    """
+    Append a snapshot of the top processes to the log of a failing result.
+    """
+    if result.success or result.exception is not None or top_n <= 0:
+        return result
+    try:
+        snapshot = _format_process_snapshot(top_n)
+    except Exception as e:
+        snapshot = f"Cannot take a snapshot of processes, original error: {e}"
+    result.log = f"{result.log.rstrip()}\n\n{snapshot}"
+    return result
+
+
+def top_processes(top_n: int = 10) -> CheckResult:
+    """
+    Snapshot of the top processes by RSS, CPU time, number of file
+    descriptors and of threads (with their Fractal and SLURM jobs), and of
+    the top users and Fractal jobs by RSS.
+    """
+    try:
+        return CheckResult(log=_format_process_snapshot(top_n))
+    except Exception as e:
+        return CheckResult(exception=e, success=False)
+
+
 def create_table(headers: list, rows: list, column_widths: list) -> str:
     """
     Create a simple table with headers and rows.
@@ -504,6 +1053,41 @@ def certificate_expiration(
             f"Not-valid-after: {not_valid_after_utc}\n"
             f"Remaining days: {days_left} (threshold {min_days})"
         )
-        return CheckResult(log=logs, success=(days_left > min_days))
+        return CheckResult(
+            log=logs,
+            success=(days_left > min_days),
+            metrics={"days_left": days_left},
+        )
     except Exception as e:
         return CheckResult(log="", success=False, exception=e)
+
+
+# Functions which can be used as `function_name` of a check
+CHECK_FUNCTIONS = {
+    "subprocess_run": subprocess_run,
+    "url_json": url_json,
+    "system_load": system_load,
+    "lsof_count": lsof_count,
+    "lsof_ssh": lsof_ssh,
+    "count_processes": count_processes,
+    "ps_count_with_threads": ps_count_with_threads,
+    "disk_usage": disk_usage,
+    "memory_usage": memory_usage,
+    "check_mounts": check_mounts,
+    "service_logs": service_logs,
+    "log_files": log_files,
+    "tcp_reachability": tcp_reachability,
+    "ssh_on_server": ssh_on_server,
+    "service_is_active": service_is_active,
+    "systemd_cgroup_usage": systemd_cgroup_usage,
+    "slurm_status": slurm_status,
+    "top_processes": top_processes,
+    "postgresql_db_info": postgresql_db_info,
+    "certificate_expiration": certificate_expiration,
+}
+
+# Check functions with a batch implementation, taking the list of kwargs of
+# several checks and returning their results (in the same order)
+BATCH_FUNCTIONS = {
+    "url_json": url_json_batch,
+}
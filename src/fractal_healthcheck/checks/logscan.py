@@ -0,0 +1,125 @@
+import json
+import os
+import re
+from typing import NamedTuple
+
+from fractal_healthcheck.utils import atomic_write
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class FileScan(NamedTuple):
+    path: str
+    start_offset: int
+    end_offset: int
+    rotated: bool
+
+
+class LogScanner:
+    """
+    Scan log files for a set of patterns, only looking at the bytes
+    appended since the previous scan.
+
+    The offset and inode of each file are persisted in `state_file`. A file
+    whose inode changed (rotation) or whose size decreased (truncation) is
+    scanned again from the start; after a rotation, the rest of the previous
+    file is scanned first, if it is found at `<path>.1`. Files seen for the
+    first time are scanned from their end, unless `scan_existing=True`.
+
+    Files are read in chunks of `CHUNK_SIZE` bytes, and all patterns are
+    compiled into a single regular expression. Only complete lines are
+    scanned: a trailing partial line is left for the next scan.
+    """
+
+    def __init__(
+        self,
+        patterns: list[str],
+        state_file: str,
+        max_samples: int = 20,
+        ignore_case: bool = False,
+        scan_existing: bool = False,
+    ):
+        self.patterns = patterns
+        self.state_file = state_file
+        self.max_samples = max_samples
+        self.scan_existing = scan_existing
+        self._group_names = [f"_p{ind}" for ind in range(len(patterns))]
+        self._regex = re.compile(
+            b"|".join(
+                f"(?P<{name}>{pattern})".encode()
+                for name, pattern in zip(self._group_names, patterns)
+            ),
+            re.IGNORECASE if ignore_case else 0,
+        )
+        self.counts = dict.fromkeys(patterns, 0)
+        self.samples: list[str] = []
+
+    def _load_state(self) -> dict[str, dict]:
+        try:
+            with open(self.state_file, "r") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def _scan_bytes(self, path: str, data: bytes):
+        last_sample_line = -1
+        for match in self._regex.finditer(data):
+            for pattern, name in zip(self.patterns, self._group_names):
+                if match.group(name) is not None:
+                    self.counts[pattern] += 1
+                    break
+            line_start = data.rfind(b"\n", 0, match.start()) + 1
+            if len(self.samples) < self.max_samples and line_start != last_sample_line:
+                last_sample_line = line_start
+                line_end = data.find(b"\n", match.end())
+                line = data[line_start : line_end if line_end >= 0 else len(data)]
+                self.samples.append(f"{path}: {line.decode('utf-8', errors='replace')}")
+
+    def _scan_file(self, path: str, offset: int) -> int:
+        """
+        Scan complete lines from `offset`, and return the offset after the
+        last complete line.
+        """
+        with open(path, "rb") as f:
+            f.seek(offset)
+            carry = b""
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                data = carry + chunk
+                cut = data.rfind(b"\n") + 1
+                if cut == 0 and len(data) > CHUNK_SIZE:
+                    # A very long line: scan it anyway, in pieces
+                    cut = len(data)
+                self._scan_bytes(path, data[:cut])
+                offset += cut
+                carry = data[cut:]
+        return offset
+
+    def scan(self, paths: list[str]) -> list[FileScan]:
+        state = self._load_state()
+        scans = []
+        for path in paths:
+            stat = os.stat(path)
+            previous = state.get(path)
+            rotated = False
+            if previous is None:
+                offset = 0 if self.scan_existing else stat.st_size
+            elif previous["inode"] != stat.st_ino or stat.st_size < previous["offset"]:
+                rotated = True
+                offset = 0
+                rotated_path = f"{path}.1"
+                if (
+                    previous["inode"] != stat.st_ino
+                    and os.path.exists(rotated_path)
+                    and os.stat(rotated_path).st_ino == previous["inode"]
+                ):
+                    self._scan_file(rotated_path, previous["offset"])
+            else:
+                offset = previous["offset"]
+            end_offset = self._scan_file(path, offset)
+            state[path] = {"inode": stat.st_ino, "offset": end_offset}
+            scans.append(FileScan(path, offset, end_offset, rotated))
+        atomic_write(self.state_file, json.dumps(state))
+        return scans
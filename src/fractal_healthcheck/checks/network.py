@@ -0,0 +1,71 @@
+import asyncio
+import time
+from typing import NamedTuple
+
+
+class ProbeResult(NamedTuple):
+    target: str
+    latency_ms: float | None
+    error: str | None
+
+
+def parse_target(target: str) -> tuple[str, int]:
+    """
+    Split `host:port` (or `[ipv6]:port`) into host and port.
+    """
+    host, sep, port = target.rpartition(":")
+    if not sep or not host or not port.isdigit():
+        raise ValueError(f"Invalid target '{target}', expected 'host:port'.")
+    return host.strip("[]"), int(port)
+
+
+async def _probe(
+    target: str, semaphore: asyncio.Semaphore
+) -> tuple[float | None, str | None]:
+    host, port = parse_target(target)
+    async with semaphore:
+        t_start = time.perf_counter()
+        try:
+            _, writer = await asyncio.open_connection(host, port)
+        except OSError as e:
+            return None, f"{e.__class__.__name__}: {e}"
+        latency_ms = (time.perf_counter() - t_start) * 1000
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return latency_ms, None
+
+
+async def _probe_all(
+    targets: list[str], timeout_seconds: float, max_concurrency: int
+) -> list[ProbeResult]:
+    semaphore = asyncio.Semaphore(max_concurrency)
+    tasks = [asyncio.create_task(_probe(target, semaphore)) for target in targets]
+    done, pending = await asyncio.wait(tasks, timeout=timeout_seconds)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.wait(pending)
+    results = []
+    for target, task in zip(targets, tasks):
+        if task in pending:
+            error = f"Timeout ({timeout_seconds} seconds)"
+            results.append(ProbeResult(target, None, error))
+        else:
+            results.append(ProbeResult(target, *task.result()))
+    return results
+
+
+def probe_tcp(
+    targets: list[str], timeout_seconds: float = 5.0, max_concurrency: int = 256
+) -> list[ProbeResult]:
+    """
+    Open TCP connections to all `targets` (`host:port`) concurrently, with
+    at most `max_concurrency` connections at a time and a global timeout.
+    Returns the connection latency, or the error, of each target.
+    """
+    for target in targets:
+        parse_target(target)
+    return asyncio.run(_probe_all(targets, timeout_seconds, max_concurrency))
@@ -0,0 +1,123 @@
+import heapq
+import os
+import re
+from typing import NamedTuple
+
+import psutil
+
+# All attributes are read in one `oneshot` pass per process
+PROCESS_ATTRS = [
+    "pid",
+    "name",
+    "username",
+    "memory_info",
+    "cpu_times",
+    "num_fds",
+    "num_threads",
+    "cmdline",
+]
+
+# Fractal job folders look like `proj_v2_0000001_wf_0000002_job_0000003_...`
+FRACTAL_JOB_PATTERN = re.compile(r"_job_(\d+)")
+# SLURM cgroups look like `/system.slice/slurmstepd.scope/job_12345/step_batch`
+SLURM_JOB_PATTERN = re.compile(r"/job_(\d+)")
+
+
+class ProcessInfo(NamedTuple):
+    pid: int
+    name: str
+    username: str
+    rss_mb: float
+    cpu_seconds: float
+    num_fds: int
+    num_threads: int
+    fractal_job: str | None
+
+
+class ProcessSnapshot(NamedTuple):
+    num_processes: int
+    # Top processes, by each of the `TOP_KEYS`
+    top: dict[str, list[ProcessInfo]]
+    # Number of processes, total RSS and CPU time of each user
+    by_user: dict[str, tuple[int, float, float]]
+    # Same, for each Fractal job
+    by_fractal_job: dict[str, tuple[int, float, float]]
+    # SLURM job of each of the top processes, if any
+    slurm_jobs: dict[int, str]
+
+
+TOP_KEYS = ["rss_mb", "cpu_seconds", "num_fds", "num_threads"]
+
+
+def _slurm_job(pid: int) -> str | None:
+    try:
+        with open(os.path.join(psutil.PROCFS_PATH, str(pid), "cgroup")) as f:
+            match = SLURM_JOB_PATTERN.search(f.read())
+    except OSError:
+        return None
+    return match.group(1) if match else None
+
+
+def _accumulate(
+    groups: dict[str, tuple[int, float, float]], key: str, process: ProcessInfo
+):
+    num, rss_mb, cpu_seconds = groups.get(key, (0, 0.0, 0.0))
+    groups[key] = (
+        num + 1,
+        rss_mb + process.rss_mb,
+        cpu_seconds + process.cpu_seconds,
+    )
+
+
+def take_snapshot(top_n: int = 10) -> ProcessSnapshot:
+    """
+    Single pass over all processes (with `psutil.process_iter`), keeping the
+    `top_n` processes by RSS, CPU time, number of file descriptors and of
+    threads, and aggregating per user. Attributes which cannot be read
+    (e.g. file descriptors of other users' processes) count as zero.
+
+    Processes are also aggregated by Fractal job (from their command
+    line). The SLURM job (from `/proc/<pid>/cgroup`) is only looked up for
+    the top processes, to avoid an additional read for every process.
+    """
+    processes = []
+    by_user = {}
+    by_fractal_job = {}
+    for proc in psutil.process_iter(PROCESS_ATTRS, ad_value=None):
+        info = proc.info
+        memory_info = info["memory_info"]
+        cpu_times = info["cpu_times"]
+        cmdline = " ".join(info["cmdline"] or [])
+        fractal_job = FRACTAL_JOB_PATTERN.search(cmdline)
+        process = ProcessInfo(
+            pid=info["pid"],
+            name=info["name"] or "?",
+            username=info["username"] or "?",
+            rss_mb=0.0 if memory_info is None else memory_info.rss / 2**20,
+            cpu_seconds=0.0 if cpu_times is None else cpu_times.user + cpu_times.system,
+            num_fds=info["num_fds"] or 0,
+            num_threads=info["num_threads"] or 0,
+            fractal_job=fractal_job.group(1).lstrip("0") if fractal_job else None,
+        )
+        processes.append(process)
+        _accumulate(by_user, process.username, process)
+        if process.fractal_job is not None:
+            _accumulate(by_fractal_job, process.fractal_job, process)
+
+    top = {
+        key: heapq.nlargest(top_n, processes, key=lambda p, key=key: getattr(p, key))
+        for key in TOP_KEYS
+    }
+    top_pids = {p.pid for processes in top.values() for p in processes}
+    slurm_jobs = {}
+    for pid in top_pids:
+        slurm_job = _slurm_job(pid)
+        if slurm_job is not None:
+            slurm_jobs[pid] = slurm_job
+    return ProcessSnapshot(
+        num_processes=len(processes),
+        top=top,
+        by_user=by_user,
+        by_fractal_job=by_fractal_job,
+        slurm_jobs=slurm_jobs,
+    )
@@ -0,0 +1,48 @@
+import functools
+from importlib.metadata import EntryPoint
+from importlib.metadata import entry_points
+from typing import Callable
+
+from fractal_healthcheck.checks import implementations
+
+ENTRY_POINT_GROUP = "fractal_healthcheck.checks"
+
+
+def _is_builtin(name: str) -> bool:
+    return name in implementations.CHECK_FUNCTIONS
+
+
+@functools.cache
+def _plugin_entry_points() -> dict[str, EntryPoint]:
+    """
+    Entry points of the `fractal_healthcheck.checks` group, by name. Only
+    package metadata is read here: plugin modules are not imported.
+    """
+    return {ep.name: ep for ep in entry_points(group=ENTRY_POINT_GROUP)}
+
+
+def is_known_check(name: str) -> bool:
+    return _is_builtin(name) or name in _plugin_entry_points()
+
+
+@functools.cache
+def get_check_function(name: str) -> Callable:
+    """
+    Resolve a check function: built-in checks (`CHECK_FUNCTIONS`, in
+    `implementations`) come first, then plugins registered in the
+    `fractal_healthcheck.checks` entry-point group, e.g.
+
+    ```toml
+    [project.entry-points."fractal_healthcheck.checks"]
+    my_check = "my_package.checks:my_check"
+    ```
+
+    A plugin module is only imported when one of its checks is resolved.
+    """
+    if _is_builtin(name):
+        return implementations.CHECK_FUNCTIONS[name]
+    try:
+        entry_point = _plugin_entry_points()[name]
+    except KeyError:
+        raise ValueError(f"Unknown check function '{name}'.")
+    return entry_point.load()
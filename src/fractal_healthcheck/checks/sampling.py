@@ -0,0 +1,172 @@
+import bisect
+import math
+import os
+import time
+from array import array
+from typing import Callable
+
+import psutil
+
+
+class SampleBuffer:
+    """
+    Fixed-size ring buffer of float samples, backed by an `array`. Once full,
+    new samples overwrite the oldest ones.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity < 1:
+            raise ValueError(f"Invalid {capacity=}.")
+        self.capacity = capacity
+        self._data = array("d", bytes(8 * capacity))
+        self._next = 0
+        self.count = 0
+
+    def add(self, value: float):
+        self._data[self._next] = value
+        self._next = (self._next + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+
+    def values(self) -> array:
+        if self.count < self.capacity:
+            return self._data[: self.count]
+        return self._data[self._next :] + self._data[: self._next]
+
+    def stats(self, threshold: float | None = None) -> dict[str, float] | None:
+        """
+        Min, mean, 95th percentile (nearest rank) and max of the samples,
+        and the percentage of samples at or above `threshold`.
+        """
+        if self.count == 0:
+            return None
+        values = sorted(self.values())
+        stats = dict(
+            min=values[0],
+            mean=math.fsum(values) / len(values),
+            p95=values[max(math.ceil(0.95 * len(values)) - 1, 0)],
+            max=values[-1],
+        )
+        if threshold is not None:
+            num_above = len(values) - bisect.bisect_left(values, threshold)
+            stats["perc_above_threshold"] = 100 * num_above / len(values)
+        return stats
+
+
+class ProcFile:
+    """
+    A `/proc` file kept open, and re-read from the start at each sample
+    (which saves an `open` and a path lookup per sample). Subclasses parse
+    the content into a single value, when called.
+    """
+
+    def __init__(self, name: str):
+        self.path = os.path.join(psutil.PROCFS_PATH, name)
+        self._fd = os.open(self.path, os.O_RDONLY)
+
+    def read(self) -> bytes:
+        return os.pread(self._fd, 8192, 0)
+
+    def close(self):
+        os.close(self._fd)
+
+
+class LoadReader(ProcFile):
+    """
+    1-minute load average, from `/proc/loadavg`.
+    """
+
+    def __init__(self):
+        super().__init__("loadavg")
+
+    def __call__(self) -> float:
+        return float(self.read().split(maxsplit=1)[0])
+
+
+class MemoryReader(ProcFile):
+    """
+    Memory usage percentage, `1 - MemAvailable/MemTotal`, from `/proc/meminfo`.
+    """
+
+    def __init__(self):
+        super().__init__("meminfo")
+
+    def __call__(self) -> float:
+        total = available = None
+        for line in self.read().splitlines():
+            if line.startswith(b"MemTotal:"):
+                total = int(line.split()[1])
+            elif line.startswith(b"MemAvailable:"):
+                available = int(line.split()[1])
+                break
+        return 100 * (1 - available / total)
+
+
+class PressureReader(ProcFile):
+    """
+    Percentage of time during which some task was stalled on `resource`
+    (`cpu`, `memory` or `io`) since the previous call, from the `some` line
+    of `/proc/pressure/<resource>` (PSI).
+    """
+
+    def __init__(self, resource: str):
+        super().__init__(os.path.join("pressure", resource))
+        # The first reading only sets the reference point
+        self._previous = self._read_total()
+
+    def _read_total(self) -> tuple[float, int]:
+        now = time.monotonic()
+        line = self.read().split(b"\n", 1)[0]
+        return now, int(line.rsplit(b"total=", 1)[1])
+
+    def __call__(self) -> float:
+        now, total = self._read_total()
+        previous_time, previous_total = self._previous
+        self._previous = (now, total)
+        elapsed_us = (now - previous_time) * 1e6
+        if elapsed_us <= 0:
+            return 0.0
+        return min(100 * (total - previous_total) / elapsed_us, 100.0)
+
+
+def pressure_reader(resource: str) -> PressureReader | None:
+    """
+    PSI reader for `resource`, or `None` if PSI is not available.
+    """
+    try:
+        return PressureReader(resource)
+    except OSError:
+        return None
+
+
+def sample(
+    readers: dict[str, Callable[[], float]],
+    window_seconds: float,
+    interval_seconds: float,
+) -> dict[str, SampleBuffer]:
+    """
+    Call each reader every `interval_seconds` for `window_seconds`, and
+    collect the values in one buffer per reader. Ticks are scheduled on a
+    fixed grid, so that a slow reading does not shift the following ones.
+    """
+    capacity = max(int(window_seconds / interval_seconds), 1)
+    buffers = {name: SampleBuffer(capacity) for name in readers}
+    t_start = time.monotonic()
+    for tick in range(capacity):
+        for name, reader in readers.items():
+            buffers[name].add(reader())
+        delay = t_start + (tick + 1) * interval_seconds - time.monotonic()
+        if delay > 0 and tick < capacity - 1:
+            time.sleep(delay)
+    return buffers
+
+
+def format_stats(name: str, stats: dict[str, float], unit: str = "") -> str:
+    line = (
+        f"{name}: min={stats['min']:.2f}{unit}, mean={stats['mean']:.2f}{unit}, "
+        f"p95={stats['p95']:.2f}{unit}, max={stats['max']:.2f}{unit}"
+    )
+    if "perc_above_threshold" in stats:
+        line = (
+            f"{line}, above threshold {stats['perc_above_threshold']:.1f}% of the time"
+        )
+    return line
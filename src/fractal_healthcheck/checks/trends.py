@@ -0,0 +1,174 @@
+import logging
+
+import numpy as np
+
+from fractal_healthcheck import LOGGER_NAME
+from fractal_healthcheck.checks import CheckSuite
+from fractal_healthcheck.checks.history import CheckHistory
+
+logger = logging.getLogger(LOGGER_NAME)
+
+# Lower bound for the standard deviation in z-scores, relative to the mean
+# (so that a small change after flat values, e.g. from rounding, is not an
+# anomaly), and in absolute terms (for values around zero)
+MIN_RELATIVE_STD = 0.01
+MIN_ABSOLUTE_STD = 1e-6
+
+
+def _stack(
+    series: list[tuple[list[float], list[float]]], window: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Stack the last (up to) `window` points of each series into two
+    `(num_series, window)` arrays of times and values, right-aligned and
+    padded with NaN on the left.
+    """
+    times = np.full((len(series), window), np.nan)
+    values = np.full((len(series), window), np.nan)
+    for row, (_times, _values) in enumerate(series):
+        num_points = min(len(_values), window)
+        if num_points:
+            times[row, window - num_points :] = _times[-num_points:]
+            values[row, window - num_points :] = _values[-num_points:]
+    return times, values
+
+
+def analyze(
+    series: list[tuple[list[float], list[float]]],
+    ewma_alpha: np.ndarray,
+    limit: np.ndarray,
+    window: int,
+) -> dict[str, np.ndarray]:
+    """
+    Compute, for all series at once:
+    * `level`: exponentially-weighted moving average (with `ewma_alpha`);
+    * `zscore`: z-score of the last value with respect to the previous ones
+      (with a standard deviation of at least `MIN_RELATIVE_STD` times their
+      mean);
+    * `slope`: least-squares slope, per hour;
+    * `hours_to_limit`: time for `level` to reach `limit` with this slope
+      (`inf` if it never does, `0` if it already did).
+
+    All computations are vectorized across series, over the last `window`
+    points of each one.
+    """
+    times, values = _stack(series, window)
+    valid = ~np.isnan(values)
+    num_points = valid.sum(axis=1)
+
+    # EWMA: one vectorized step (across series) per point in the window
+    level = np.full(len(series), np.nan)
+    for col in range(window):
+        x = values[:, col]
+        updated = np.where(
+            np.isnan(level), x, ewma_alpha * x + (1 - ewma_alpha) * level
+        )
+        level = np.where(np.isnan(x), level, updated)
+
+    # z-score of the last value, with respect to the previous ones
+    previous = np.where(valid[:, :-1], values[:, :-1], 0.0)
+    num_previous = valid[:, :-1].sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = previous.sum(axis=1) / num_previous
+        deviations = np.where(valid[:, :-1], values[:, :-1] - mean[:, None], 0.0)
+        std = np.sqrt((deviations**2).sum(axis=1) / num_previous)
+        std = np.maximum(
+            std, np.maximum(MIN_RELATIVE_STD * np.abs(mean), MIN_ABSOLUTE_STD)
+        )
+        zscore = (values[:, -1] - mean) / std
+
+    # Least-squares slope over time (in hours from the last point)
+    hours = np.where(valid, (times - times[:, -1:]) / 3600, 0.0)
+    v = np.where(valid, values, 0.0)
+    sum_t = hours.sum(axis=1)
+    sum_v = v.sum(axis=1)
+    sum_tt = (hours**2).sum(axis=1)
+    sum_tv = (hours * v).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = (num_points * sum_tv - sum_t * sum_v) / (num_points * sum_tt - sum_t**2)
+        hours_to_limit = np.where(
+            level >= limit,
+            0.0,
+            np.where(slope > 0, (limit - level) / slope, np.inf),
+        )
+    return dict(
+        num_points=num_points,
+        level=level,
+        zscore=zscore,
+        slope=slope,
+        hours_to_limit=hours_to_limit,
+    )
+
+
+def apply_trends(check_suite: CheckSuite, history: CheckHistory):
+    """
+    Run trend detection for all checks with `trend` settings (which have
+    run, and have enough history) in a single batched pass, append the
+    findings to their logs and mark them as failing when the forecast or
+    the anomaly thresholds are exceeded.
+    """
+    checks = []
+    series = []
+    for _check in check_suite.checks:
+        if _check.trend is None or _check.result is None:
+            continue
+        if _check.result.runtime is None:
+            continue
+        times, values = history.metric_series(_check.name, _check.trend.metric)
+        if len(values) < _check.trend.min_points:
+            logger.info(
+                f"['{_check.name}'] Not enough history for trend detection "
+                f"({len(values)} points)."
+            )
+            continue
+        checks.append(_check)
+        series.append((times, values))
+    if not checks:
+        return
+
+    window = max(_check.trend.window for _check in checks)
+    ewma_alpha = np.array([_check.trend.ewma_alpha for _check in checks])
+    limit = np.array(
+        [
+            np.inf if _check.trend.limit is None else _check.trend.limit
+            for _check in checks
+        ]
+    )
+    # Series with a smaller window are truncated to it, before stacking
+    series = [
+        (times[-_check.trend.window :], values[-_check.trend.window :])
+        for _check, (times, values) in zip(checks, series)
+    ]
+    analysis = analyze(series, ewma_alpha=ewma_alpha, limit=limit, window=window)
+
+    for row, _check in enumerate(checks):
+        trend = _check.trend
+        result = _check.result
+        lines = [
+            f"Trend of '{trend.metric}' over {analysis['num_points'][row]} points: "
+            f"level={analysis['level'][row]:.4g}, "
+            f"slope={analysis['slope'][row] * 24:.4g}/day, "
+            f"z-score={analysis['zscore'][row]:.2f}"
+        ]
+        failing = False
+        if trend.limit is not None:
+            hours_to_limit = analysis["hours_to_limit"][row]
+            if np.isinf(hours_to_limit):
+                lines.append(f"Not forecast to reach {trend.limit}.")
+            else:
+                lines.append(
+                    f"Forecast to reach {trend.limit} in {hours_to_limit:.1f} hours "
+                    f"(threshold {trend.min_hours_to_limit} hours)."
+                )
+            if hours_to_limit < trend.min_hours_to_limit:
+                failing = True
+        if trend.max_zscore is not None:
+            if abs(analysis["zscore"][row]) > trend.max_zscore:
+                lines.append(
+                    f"Anomalous last value (z-score threshold {trend.max_zscore})."
+                )
+                failing = True
+        result.log = f"{result.log.rstrip()}\n" + "\n".join(lines)
+        if failing:
+            logger.info(f"['{_check.name}'] Failing trend detection.")
+            result.success = False
@@ -0,0 +1,206 @@
+import json
+import logging
+import shlex
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import yaml
+from fabric.connection import Connection
+from pydantic import BaseModel
+from pydantic import Field
+from pydantic import model_validator
+
+from fractal_healthcheck import LOGGER_NAME
+from fractal_healthcheck.checks import Check
+from fractal_healthcheck.checks import CheckSuite
+from fractal_healthcheck.checks.CheckResults import CheckResult
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+class FleetHost(BaseModel):
+    """
+    A remote host where `fractal-health` is installed, together with the
+    path of its (remote) configuration file.
+    """
+
+    host: str
+    username: str
+    config_file: str
+    port: int = 22
+    password: Optional[str] = None
+    private_key_path: Optional[str] = None
+    command: str = "fractal-health"
+
+    @model_validator(mode="after")
+    def one_authentication_method(self):
+        if (self.password is None) == (self.private_key_path is None):
+            raise ValueError(
+                f"Host '{self.host}': set exactly one of password and private_key_path."
+            )
+        return self
+
+
+class FleetSettings(BaseModel):
+    hosts: list[FleetHost] = Field(min_length=1)
+    max_concurrency: int = Field(default=8, ge=1)
+    timeout_seconds: int = Field(default=600, gt=0)
+
+    @model_validator(mode="after")
+    def unique_hosts(self):
+        hosts = [fleet_host.host for fleet_host in self.hosts]
+        if len(hosts) != len(set(hosts)):
+            raise ValueError(f"Non-unique list of fleet hosts: {hosts}.")
+        return self
+
+
+def load_fleet_config(config_file: str) -> FleetSettings | None:
+    """
+    Load the `fleet-config` section, if present.
+    """
+    with open(config_file, "r") as f:
+        config = yaml.safe_load(f)
+    fleet_config = config.get("fleet-config")
+    if fleet_config is None:
+        return None
+    return FleetSettings(**fleet_config)
+
+
+class ConnectionPool:
+    """
+    Open SSH connections, by (username, host, port), so that they can be
+    reused across fleet runs within the same process.
+    """
+
+    def __init__(self):
+        self._connections: dict[tuple[str, str, int], Connection] = {}
+        self._lock = threading.Lock()
+
+    def get(self, fleet_host: FleetHost) -> Connection:
+        key = (fleet_host.username, fleet_host.host, fleet_host.port)
+        with self._lock:
+            connection = self._connections.get(key)
+            if connection is None:
+                connection = Connection(
+                    host=fleet_host.host,
+                    user=fleet_host.username,
+                    port=fleet_host.port,
+                    forward_agent=False,
+                )
+                if fleet_host.password is not None:
+                    connection.connect_kwargs.update({"password": fleet_host.password})
+                else:
+                    connection.connect_kwargs.update(
+                        {
+                            "key_filename": fleet_host.private_key_path,
+                            "look_for_keys": False,
+                        }
+                    )
+                self._connections[key] = connection
+        return connection
+
+    def close_all(self):
+        with self._lock:
+            for connection in self._connections.values():
+                connection.close()
+            self._connections = {}
+
+
+def parse_json_report(report: str) -> CheckSuite:
+    """
+    Rebuild a CheckSuite (with results) from a JSON report.
+    """
+    data = json.loads(report)
+    checks = []
+    for item in data["checks"]:
+        result = CheckResult.from_dict(item)
+        if "skipped" not in item:
+            # Reports of older versions only have the status
+            result.skipped = item["status"] == "SKIPPED"
+            result.timed_out = item["status"] == "TIMEOUT"
+        # Remote results are not validated again: their check functions may
+        # only be available on the remote host
+        checks.append(
+            Check.model_construct(
+                name=item["name"], function_name="remote", result=result
+            )
+        )
+    return CheckSuite(checks=checks)
+
+
+def run_on_host(
+    pool: ConnectionPool,
+    fleet_host: FleetHost,
+    timeout_seconds: int,
+) -> CheckSuite:
+    """
+    Run the check suite on a remote host, and collect its JSON report from
+    standard output. Any failure (SSH, remote command, parsing) becomes a
+    single failing check.
+    """
+    command = (
+        f"{fleet_host.command} {shlex.quote(fleet_host.config_file)} "
+        "--format json --output-file -"
+    )
+    logger.info(f"[run_on_host] {fleet_host.host}: {command}")
+    try:
+        connection = pool.get(fleet_host)
+        res = connection.run(command, hide=True, timeout=timeout_seconds)
+        return parse_json_report(res.stdout)
+    except Exception as e:
+        result = CheckResult(exception=e, success=False)
+        return CheckSuite(
+            checks=[
+                Check.model_construct(
+                    name="Fleet run", function_name="remote", result=result
+                )
+            ]
+        )
+
+
+def run_fleet(
+    settings: FleetSettings,
+    pool: Optional[ConnectionPool] = None,
+) -> dict[str, CheckSuite]:
+    """
+    Run the check suite on all hosts, with at most `max_concurrency` of them
+    at the same time. Returns the per-host suites, in the configured order.
+
+    If no `pool` is given, a temporary one is used and closed at the end.
+    """
+    own_pool = pool is None
+    if own_pool:
+        pool = ConnectionPool()
+    try:
+        with ThreadPoolExecutor(max_workers=settings.max_concurrency) as executor:
+            suites = executor.map(
+                lambda fleet_host: run_on_host(
+                    pool, fleet_host, timeout_seconds=settings.timeout_seconds
+                ),
+                settings.hosts,
+            )
+            return {
+                fleet_host.host: suite
+                for fleet_host, suite in zip(settings.hosts, suites)
+            }
+    finally:
+        if own_pool:
+            pool.close_all()
+
+
+def merge_fleet_results(host_suites: dict[str, CheckSuite]) -> CheckSuite:
+    """
+    Merge per-host suites into a single one, with `host: name` check names.
+    """
+    return CheckSuite(
+        checks=[
+            Check.model_construct(
+                name=f"{host}: {_check.name}",
+                function_name=_check.function_name,
+                result=_check.result,
+            )
+            for host, suite in host_suites.items()
+            for _check in suite.checks
+        ]
+    )
@@ -0,0 +1,69 @@
+import fcntl
+import json
+import logging
+import os
+from datetime import datetime
+from datetime import timezone
+
+from fractal_healthcheck import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+class RunLock:
+    """
+    Single-flight lock, based on `flock` over `lock_file`.
+
+    The lock is released by the kernel when the holding process exits, so
+    that a crashed run never leaves a stale lock behind. The holder writes
+    its PID and start time into the file, for the benefit of other runs.
+    """
+
+    def __init__(self, lock_file: str):
+        self.lock_file = lock_file
+        self._fd: int | None = None
+
+    def acquire(self) -> bool:
+        """
+        Try to acquire the lock without blocking.
+        """
+        fd = os.open(self.lock_file, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(
+            fd,
+            json.dumps(
+                dict(pid=os.getpid(), started=datetime.now(tz=timezone.utc).isoformat())
+            ).encode(),
+        )
+        self._fd = fd
+        logger.info(f"[RunLock] Acquired {self.lock_file}")
+        return True
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+            logger.info(f"[RunLock] Released {self.lock_file}")
+
+
+def describe_lock_holder(lock_file: str) -> str:
+    """
+    Describe the run currently holding `lock_file` (PID, start time, age).
+    """
+    try:
+        with open(lock_file, "r") as f:
+            holder = json.load(f)
+        started = datetime.fromisoformat(holder["started"])
+        age = datetime.now(tz=timezone.utc) - started
+        return (
+            f"Previous run still in progress (pid {holder['pid']}, "
+            f"started at {started}, running for {age})."
+        )
+    except Exception as e:
+        return f"Previous run still in progress (no details, original error: {e})."
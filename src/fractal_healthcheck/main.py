@@ -2,21 +2,59 @@
 
 import click
 import logging
+import os
 import sys
 import time
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from pathlib import Path
 from typing import Optional
 
+import psutil
+
 from fractal_healthcheck import LOGGER_NAME
+from fractal_healthcheck.archive import ArchiveSettings
+from fractal_healthcheck.archive import ReportArchive
 from fractal_healthcheck.report import load_email_config
 from fractal_healthcheck.report import load_general_config
 from fractal_healthcheck.report import prepare_report
 from fractal_healthcheck.report import report_to_file
 from fractal_healthcheck.report import report_to_email
+from fractal_healthcheck.checks import Check
+from fractal_healthcheck.checks import CheckSuite
 from fractal_healthcheck.checks import load_check_suite
+from fractal_healthcheck.checks.CheckResults import CheckResult
+from fractal_healthcheck.checks.history import CheckHistory
+from fractal_healthcheck.fleet import load_fleet_config
+from fractal_healthcheck.fleet import merge_fleet_results
+from fractal_healthcheck.fleet import run_fleet
+from fractal_healthcheck.lock import RunLock
+from fractal_healthcheck.lock import describe_lock_holder
+from fractal_healthcheck.profiling import Profiler
 
 logger = logging.getLogger(LOGGER_NAME)
 
 
+class _DefaultGroup(click.Group):
+    """
+    Command group which falls back to the `run` command when the first
+    argument is not a subcommand, so that `fractal-health CONFIG_FILE`
+    keeps working.
+    """
+
+    def parse_args(self, ctx, args):
+        if args and args[0] not in self.commands and args[0] != "--help":
+            args = ["run", *args]
+        return super().parse_args(ctx, args)
+
+
+@click.group(cls=_DefaultGroup)
+def cli():
+    """
+    Monitor Fractal instances. Without a subcommand, `run` is used.
+    """
+
+
 @click.command()
 @click.argument(
     "config_file",
@@ -38,7 +76,15 @@ logger = logging.getLogger(LOGGER_NAME)
     "--output-file",
     "output_file",
     type=click.STRING,
-    help="Append report to this text file.",
+    help="Append report to this text file ('-' for standard output).",
+)
+@click.option(
+    "-f",
+    "--format",
+    "report_format",
+    type=click.Choice(["text", "json", "html"]),
+    default="text",
+    help="Format of the report written to the output file (email reports are always text).",
 )
 @click.option(
     "-s",
@@ -48,12 +94,27 @@ logger = logging.getLogger(LOGGER_NAME)
     is_flag=True,
     help="Send report by email, if appropriate.",
 )
+@click.option(
+    "--profile",
+    "profile",
+    default=False,
+    is_flag=True,
+    help=(
+        "Profile checks and report (cProfile and tracemalloc), writing pstats "
+        "files and a summary next to the output file."
+    ),
+)
 def main(
     config_file: str,
     log_level: str,
     output_file: Optional[str] = None,
     send_mail: bool = False,
+    report_format: str = "text",
+    profile: bool = False,
 ):
+    """
+    Run checks, and report their results.
+    """
     # Setup logging config
     logging.basicConfig(
         format="[%(asctime)s] %(levelname)s %(message)s",
@@ -62,29 +123,131 @@ def main(
     )
 
     # Load configurations
-    checks_suite = load_check_suite(config_file)
+    fleet_settings = load_fleet_config(config_file)
+    if fleet_settings is None:
+        checks_suite = load_check_suite(config_file)
+    general_settings = load_general_config(config_file)
     if send_mail:
         email_config = load_email_config(config_file)
         instance_name = email_config.instance_name
     else:
         instance_name = None
 
+    # Single-flight lock: do not run checks while a previous run is ongoing
+    run_lock = None
+    locked = False
+    if general_settings.lock_file is not None:
+        run_lock = RunLock(general_settings.lock_file)
+        if not run_lock.acquire():
+            run_lock = None
+            message = describe_lock_holder(general_settings.lock_file)
+            if general_settings.on_locked == "exit":
+                logger.warning(f"{message} Exit.")
+                return 0
+            logger.warning(f"{message} Only report about the lock.")
+            locked = True
+            checks_suite = CheckSuite(
+                checks=[
+                    Check.model_construct(
+                        name="Previous run",
+                        function_name="run_lock",
+                        result=CheckResult(log=message, success=False),
+                    )
+                ]
+            )
+
+    if profile:
+        profile_dir = Path(output_file).parent if output_file else Path.cwd()
+        timestamp = datetime.now(tz=timezone.utc).strftime("%Y%m%dT%H%M%S")
+        profiler = Profiler(profile_dir / f"fractal-health-profile-{timestamp}")
+        profiler.start()
+    else:
+        profiler = None
+
     # Run checks and get the checks' execution time
     t_start = time.time()
-    checks_suite.run()
+    if general_settings.history_file is not None:
+        history = CheckHistory.from_file(general_settings.history_file)
+    else:
+        history = None
+    if locked:
+        # Only report about the lock, without running any check
+        host_suites = None
+    elif fleet_settings is None:
+        host_suites = None
+        checks_suite.run(
+            max_workers=general_settings.max_workers,
+            profiler=profiler,
+            deadline_seconds=general_settings.deadline_seconds,
+            history=history,
+        )
+    else:
+        # Fleet mode: run the check suites remotely, and merge their results
+        host_suites = run_fleet(fleet_settings)
+        checks_suite = merge_fleet_results(host_suites)
     checks_runtime = round(time.time() - t_start, 2)
+    if history is not None:
+        history.update(
+            checks_suite.get_results(),
+            tracked_metrics={
+                _check.name: (
+                    _check.trend.metric,
+                    max(_check.trend.window, _check.trend.min_points),
+                )
+                for _check in checks_suite.checks
+                if _check.trend is not None
+            },
+        )
+        history.to_file(general_settings.history_file)
+    if any(_check.trend is not None for _check in checks_suite.checks):
+        if history is None:
+            logger.warning("Trend detection requires the `history_file` setting.")
+        else:
+            try:
+                from fractal_healthcheck.checks.trends import apply_trends
+            except ImportError as e:
+                # Still send the report, without trend detection
+                logger.warning(
+                    "Trend detection requires the `trends` extra "
+                    f"(original error: {e}), skip it."
+                )
+            else:
+                apply_trends(checks_suite, history)
 
-    # Prepare report
-    report = prepare_report(
-        checks_suite,
+    report_kwargs = dict(
+        check_suite=checks_suite,
         checks_runtime=checks_runtime,
         instance_name=instance_name,
-        general_settings=load_general_config(config_file),
+        general_settings=general_settings,
+        report_timestamp=datetime.now(tz=timezone.utc),
+        host_suites=host_suites,
     )
 
-    # Write report to file
-    if output_file is not None:
-        report_to_file(report=report, filename=output_file)
+    with profiler.section("report", group="report") if profiler else nullcontext():
+        # Write report to file
+        if output_file is not None:
+            report_to_file(
+                filename=output_file,
+                report_format=report_format,
+                **report_kwargs,
+            )
+        report = prepare_report(**report_kwargs) if send_mail else None
+        if general_settings.archive is not None:
+            if report_format == "text" and report is not None:
+                archive_report = report
+            else:
+                archive_report = prepare_report(
+                    report_format=report_format, **report_kwargs
+                )
+            ReportArchive(general_settings.archive).add(
+                archive_report,
+                timestamp=report_kwargs["report_timestamp"],
+                status="FAIL" if checks_suite.any_failing else "PASS",
+                report_format=report_format,
+            )
+
+    if profiler is not None:
+        profiler.stop()
 
     # Send report by email
     if send_mail:
@@ -92,10 +255,89 @@ def main(
             check_suite=checks_suite,
             report=report,
             mail_settings=email_config,
+            max_log_size=general_settings.max_log_size,
+            partial=locked,
         )
 
+    still_running = [
+        _check.name
+        for _check in checks_suite.checks
+        if _check.result.timed_out and _check.result.runtime is not None
+    ]
+    if still_running:
+        _exit_now(still_running)
+    if run_lock is not None:
+        run_lock.release()
+
     return 0
 
 
+def _exit_now(still_running: list[str]):
+    """
+    Exit right away, without waiting for checks which outlived the deadline:
+    their worker threads cannot be interrupted, and would otherwise keep the
+    process (and its run lock) alive until they complete. Child processes
+    (e.g. commands of these checks) are killed first; the run lock is
+    released by the kernel when the process exits.
+    """
+    logger.warning(f"Exit without waiting for {still_running}.")
+    for child in psutil.Process().children(recursive=True):
+        try:
+            child.kill()
+        except psutil.Error:
+            pass
+    logging.shutdown()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os._exit(0)
+
+
+cli.add_command(main, name="run")
+
+
+@cli.command()
+@click.option(
+    "-d",
+    "--archive-dir",
+    "archive_dir",
+    type=click.Path(exists=True, file_okay=False),
+    required=True,
+    help="Report archive folder (`archive.directory` general setting).",
+)
+@click.option(
+    "--at",
+    "at",
+    type=click.STRING,
+    default=None,
+    help="Show the last report at or before this ISO time (UTC if no timezone is given), instead of the last one.",
+)
+@click.option(
+    "--failing",
+    "failing_only",
+    default=False,
+    is_flag=True,
+    help="Only consider reports with failing checks.",
+)
+def show(archive_dir: str, at: Optional[str] = None, failing_only: bool = False):
+    """
+    Print a report from the archive.
+    """
+    if at is not None:
+        try:
+            at = datetime.fromisoformat(at)
+        except ValueError:
+            raise click.BadParameter(
+                f"'{at}' is not an ISO time (e.g. 2025-01-31T12:00).",
+                param_hint="'--at'",
+            )
+        if at.tzinfo is None:
+            at = at.replace(tzinfo=timezone.utc)
+    archive = ReportArchive(ArchiveSettings(directory=archive_dir))
+    entry = archive.lookup(at=at, failing_only=failing_only)
+    if entry is None:
+        raise click.ClickException("No matching report in the archive.")
+    click.echo(archive.read(entry), nl=False)
+
+
 if __name__ == "__main__":
-    sys.exit(main())
+    sys.exit(cli())
@@ -0,0 +1,97 @@
+import cProfile
+import io
+import logging
+import pstats
+import re
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+from fractal_healthcheck import LOGGER_NAME
+
+logger = logging.getLogger(LOGGER_NAME)
+
+
+class Profiler:
+    """
+    Collect cProfile statistics and tracemalloc peaks for named sections
+    (e.g. one per check, plus one for the report), and write them to
+    `output_dir` as pstats files and a short text summary.
+
+    Sections must not be nested, since a single cProfile profiler can be
+    active at a time.
+    """
+
+    def __init__(self, output_dir: Path, top_n: int = 20):
+        self.output_dir = Path(output_dir)
+        self.top_n = top_n
+        self.sections: list[dict] = []
+
+    def start(self):
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        tracemalloc.start()
+        logger.info(f"[Profiler] Writing profiles to {self.output_dir}")
+
+    def stop(self):
+        self._write_summary()
+        tracemalloc.stop()
+        logger.info(f"[Profiler] Summary in {self.output_dir / 'summary.txt'}")
+
+    @contextmanager
+    def section(self, name: str, group: str):
+        """
+        Profile the wrapped block. Sections with the same `group` are
+        aggregated in the summary.
+        """
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", name).strip("-").lower()
+        pstats_file = self.output_dir / f"{len(self.sections):03d}-{slug}.pstats"
+        memory_at_start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        profile = cProfile.Profile()
+        t_start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            wall_time = time.perf_counter() - t_start
+            peak_memory = tracemalloc.get_traced_memory()[1] - memory_at_start
+            profile.dump_stats(pstats_file)
+            self.sections.append(
+                dict(
+                    name=name,
+                    group=group,
+                    pstats_file=pstats_file,
+                    wall_time=wall_time,
+                    peak_memory=peak_memory,
+                )
+            )
+
+    def _write_summary(self):
+        out = io.StringIO()
+        out.write("# Sections by wall time\n\n")
+        for section in sorted(self.sections, key=lambda s: -s["wall_time"]):
+            out.write(
+                f"{section['wall_time']:9.3f} s  "
+                f"peak {section['peak_memory'] / 2**20:8.2f} MiB  "
+                f"{section['name']}  ({section['pstats_file'].name})\n"
+            )
+
+        groups = {}
+        for section in self.sections:
+            groups.setdefault(section["group"], []).append(section["pstats_file"])
+        for group, pstats_files in groups.items():
+            out.write(
+                f"\n# Top {self.top_n} functions by cumulative time ({group})\n\n"
+            )
+            stats = pstats.Stats(*map(str, pstats_files), stream=out)
+            stats.strip_dirs().sort_stats("cumulative").print_stats(self.top_n)
+
+        out.write(f"\n# Top {self.top_n} memory allocation sites still alive\n\n")
+        snapshot = tracemalloc.take_snapshot()
+        for stat in snapshot.statistics("lineno")[: self.top_n]:
+            out.write(f"{stat}\n")
+
+        with (self.output_dir / "summary.txt").open("w") as f:
+            f.write(out.getvalue())
@@ -1,5 +1,16 @@
+import gzip
+import hashlib
+import html
+import io
+import json
+import sys
 import yaml
 import logging
+from contextlib import nullcontext
+from typing import Any
+from typing import Literal
+from typing import Optional
+from typing import TextIO
 from datetime import datetime, timezone, timedelta
 import smtplib
 from email.message import EmailMessage
@@ -7,8 +18,11 @@ import textwrap
 from pydantic import BaseModel, Field, EmailStr
 from fractal_healthcheck import LOGGER_NAME
 import fractal_healthcheck
+from fractal_healthcheck.archive import ArchiveSettings
+from fractal_healthcheck.utils import atomic_write
 
 from fractal_healthcheck.checks import CheckSuite
+from fractal_healthcheck.checks.CheckResults import CheckResult
 
 logger = logging.getLogger(LOGGER_NAME)
 
@@ -25,10 +39,19 @@ class MailSettings(BaseModel):
     grace_time_not_triggering_hours: int = 72
     grace_time_triggering_hours: int = 4
     instance_name: str
+    email_body: Literal["diff", "full"] = "diff"
+    max_inline_size: int = Field(default=100_000, ge=0)
+    smtp_timeout_seconds: float = Field(default=30.0, gt=0)
 
 
 class GeneralSettings(BaseModel):
     max_log_size: int = 20_000
+    max_workers: int = Field(default=1, ge=1)
+    deadline_seconds: float | None = Field(default=None, gt=0)
+    history_file: str | None = None
+    lock_file: str | None = None
+    on_locked: Literal["exit", "report"] = "exit"
+    archive: ArchiveSettings | None = None
 
 
 def load_email_config(config_file: str) -> MailSettings:
@@ -53,18 +76,23 @@ def load_general_config(config_file: str) -> GeneralSettings:
 
 class LastMailStatus:
     """
-    Record when the last email was sent.
-    Currently: record only 'last' - it reflects some choices
-    from a multiple-timestamp scheme, which we may need later on.
+    Record when the last email was sent, and the state of each check
+    (status, when it last changed, and a hash of its output) as of the
+    last run. Only the checks of the last full run are recorded, plus
+    those of any partial run since then (e.g. a report about the run lock
+    only).
     """
 
     last_email_timestamp: datetime | None
+    checks: dict[str, dict] | None
 
     def __init__(
         self,
         last_email_timestamp: datetime | None = None,
+        checks: dict[str, dict] | None = None,
     ):
         self.last_email_timestamp = last_email_timestamp
+        self.checks = checks
 
     @classmethod
     def from_yaml(cls, in_yaml):
@@ -74,7 +102,10 @@ class LastMailStatus:
         loaded = yaml.safe_load(in_yaml)
         # in_yaml may be empty
         if loaded is not None:
-            return cls(last_email_timestamp=loaded.get("last_email_timestamp", None))
+            return cls(
+                last_email_timestamp=loaded.get("last_email_timestamp", None),
+                checks=loaded.get("checks", None),
+            )
         else:
             return cls()
 
@@ -82,7 +113,13 @@ class LastMailStatus:
         """
         out_yaml: anything that yaml.safe_dump can return to (str, open file object, ...)
         """
-        yaml.safe_dump({"last_email_timestamp": self.last_email_timestamp}, out_yaml)
+        return yaml.safe_dump(
+            {
+                "last_email_timestamp": self.last_email_timestamp,
+                "checks": self.checks,
+            },
+            out_yaml,
+        )
 
     def update(self):
         """
@@ -91,43 +128,98 @@ class LastMailStatus:
         self.last_email_timestamp = datetime.now(tz=timezone.utc)
         return self
 
+    def diff(self, results: dict[str, CheckResult]) -> dict[str, list[str]] | None:
+        """
+        Compare results with the recorded check states. Returns `None` if no
+        check state was ever recorded (e.g. for status files of older
+        versions), since then there is nothing to compare with.
+        """
+        if self.checks is None:
+            return None
+        changes = dict(
+            newly_failing=[], recovered=[], changed_output=[], still_failing=[]
+        )
+        for name, result in results.items():
+            previous = self.checks.get(name)
+            previous_success = previous is None or previous["status"] == "PASS"
+            if result.success and not previous_success:
+                changes["recovered"].append(name)
+            elif not result.success and previous_success:
+                changes["newly_failing"].append(name)
+            elif not result.success:
+                if previous["log_hash"] != _log_hash(result):
+                    changes["changed_output"].append(name)
+                else:
+                    changes["still_failing"].append(name)
+        return changes
+
+    def update_checks(self, results: dict[str, CheckResult], partial: bool = False):
+        """
+        Record the current state of each check, keeping the time of the last
+        status change for checks whose status did not change. A full run
+        replaces the recorded checks, while a `partial` run (e.g. a report
+        about the run lock only) keeps the state of checks not in `results`.
+        """
+        now = datetime.now(tz=timezone.utc)
+        previous_checks = self.checks or {}
+        checks = dict(previous_checks) if partial else {}
+        for name, result in results.items():
+            previous = previous_checks.get(name)
+            if previous is not None and previous["status"] == result.status:
+                since = previous["since"]
+            else:
+                since = now
+            checks[name] = dict(
+                status=result.status, since=since, log_hash=_log_hash(result)
+            )
+        self.checks = checks
+        return self
 
-def prepare_report(
-    check_suite: CheckSuite,
-    checks_runtime: float,
-    instance_name: str | None,
-    general_settings: GeneralSettings,
-) -> str:
-    """
-    Format the results in a CheckSuite instance to a string.
-    It takes as argument also the time needed to run the checks.
 
-    Also reports the number of not succeeding checks.
-    Apart from this, for the moment being this does not expect any schema in 'results_dict',
-    it simply wraps string concatenation as "key: str(value)"
+def _log_hash(result: CheckResult) -> str:
+    return hashlib.sha256(result.full_log.encode("utf-8")).hexdigest()[:16]
 
-    Formatting is minimal. Since a newline at the end of a check output is not ensured,
-    one is always added before a check. Then we strip duplicate newlines.
-    Indent is added, for readability.
-    """
 
-    # Filtering failing and count them and print a list
-    failing = check_suite.get_failing_results()
-    remaining = check_suite.get_non_failing_results()
-    summary = (
-        f"# Summary\n\n"
-        f"Fractal instance: {instance_name}\n"
-        f"Report timestamp: {datetime.now(tz=timezone.utc)}\n"
-        f"Fractal-healthcheck version: {fractal_healthcheck.__VERSION__}\n"
-        f"Total number of checks: {len(check_suite.checks)}\n"
-        f"Number of failed checks: {len(failing)}\n"
-        f"Checks Runtime: {checks_runtime} seconds\n"
-        "\n"
-    )
+ReportFormat = Literal["text", "json", "html"]
+
+SEPARATOR = "-" * 80 + "\n\n"
+
+DETAILED_REPORT_HEADER = "# Detailed report"
+
+
+def _split_results(
+    check_suite: CheckSuite,
+) -> tuple[dict[str, CheckResult], dict[str, CheckResult]]:
+    """
+    Split results into failing and non-failing ones, in a single pass.
+    """
+    failing = {}
+    remaining = {}
+    for _check in check_suite.checks:
+        if _check.result.success:
+            remaining[_check.name] = _check.result
+        else:
+            failing[_check.name] = _check.result
+    return failing, remaining
+
+
+def _write_text_report(
+    f: TextIO,
+    summary: dict[str, Any],
+    failing: dict[str, CheckResult],
+    remaining: dict[str, CheckResult],
+    max_log_size: int,
+    host_sections: dict[str, tuple[dict, dict]] | None = None,
+) -> list[str]:
+    f.write("# Summary\n\n")
+    for key, value in summary.items():
+        f.write(f"{key}: {value}\n")
+    f.write("\n")
+    f.write(SEPARATOR)
 
     msg_failing = textwrap.indent("\n".join(failing.keys()), " * ")
     msg_remaining = textwrap.indent("\n".join(remaining.keys()), " * ")
-    recap = (
+    f.write(
         "# Recap\n\n"
         "List of failed checks:\n"
         f"{msg_failing}\n"
@@ -135,53 +227,420 @@ def prepare_report(
         f"{msg_remaining}\n"
         "\n"
     )
+    f.write(SEPARATOR)
+
+    truncated = []
+    f.write(f"{DETAILED_REPORT_HEADER}\n\n")
+    if host_sections is None:
+        host_sections = {None: (failing, remaining)}
+    for host, (host_failing, host_remaining) in host_sections.items():
+        if host is not None:
+            f.write(f"## Host: {host}\n\n")
+        for results in (host_failing, host_remaining):
+            for name, result in results.items():
+                if result.write_for_report(f, name=name, max_log_size=max_log_size):
+                    truncated.append(name if host is None else f"{host}: {name}")
+    f.write("End of report\n")
+    f.write(SEPARATOR)
+    return truncated
+
+
+def _truncated_log(result: CheckResult, max_log_size: int) -> tuple[str, bool]:
+    log = result.full_log
+    if len(log) > max_log_size:
+        return log[:max_log_size], True
+    return log, False
+
+
+def _write_json_report(
+    f: TextIO,
+    summary: dict[str, Any],
+    failing: dict[str, CheckResult],
+    remaining: dict[str, CheckResult],
+    max_log_size: int,
+    host_sections: dict[str, tuple[dict, dict]] | None = None,
+) -> list[str]:
+    truncated = []
+    f.write('{"summary": ')
+    f.write(json.dumps(summary, default=str))
+    f.write(', "checks": [')
+    first = True
+    if host_sections is None:
+        host_sections = {None: (failing, remaining)}
+    for host, (host_failing, host_remaining) in host_sections.items():
+        for results in (host_failing, host_remaining):
+            for name, result in results.items():
+                if host is not None:
+                    name = f"{host}: {name}"
+                # The result fields, with a truncated log (or exception)
+                result_data = result.to_dict()
+                log_field = "log" if result.exception is None else "exception"
+                is_truncated = len(result_data[log_field]) > max_log_size
+                if is_truncated:
+                    truncated.append(name)
+                    result_data[log_field] = result_data[log_field][:max_log_size]
+                if not first:
+                    f.write(",")
+                first = False
+                f.write("\n")
+                item = {"name": name}
+                if host is not None:
+                    item["host"] = host
+                item["status"] = result.status
+                item["truncated"] = is_truncated
+                item.update(result_data)
+                f.write(json.dumps(item))
+    f.write("\n]}\n")
+    return truncated
+
+
+def _write_html_report(
+    f: TextIO,
+    summary: dict[str, Any],
+    failing: dict[str, CheckResult],
+    remaining: dict[str, CheckResult],
+    max_log_size: int,
+    host_sections: dict[str, tuple[dict, dict]] | None = None,
+) -> list[str]:
+    esc = html.escape
+    f.write(
+        '<!DOCTYPE html>\n<html>\n<head>\n<meta charset="utf-8">\n'
+        f"<title>Fractal healthcheck report ({esc(str(summary['Fractal instance']))})"
+        "</title>\n</head>\n<body>\n"
+    )
+    f.write("<h1>Summary</h1>\n<ul>\n")
+    for key, value in summary.items():
+        f.write(f"<li>{esc(key)}: {esc(str(value))}</li>\n")
+    f.write("</ul>\n<h1>Recap</h1>\n")
+    for title, results in (
+        ("List of failed checks", failing),
+        ("List of successful checks", remaining),
+    ):
+        f.write(f"<p>{title}:</p>\n<ul>\n")
+        for name in results.keys():
+            f.write(f"<li>{esc(name)}</li>\n")
+        f.write("</ul>\n")
+
+    truncated = []
+    f.write("<h1>Detailed report</h1>\n")
+    if host_sections is None:
+        host_sections = {None: (failing, remaining)}
+    for host, (host_failing, host_remaining) in host_sections.items():
+        # With hosts, checks are one heading level below their host
+        level = 2
+        if host is not None:
+            f.write(f"<h2>Host: {esc(host)}</h2>\n")
+            level = 3
+        for results in (host_failing, host_remaining):
+            for name, result in results.items():
+                log, is_truncated = _truncated_log(result, max_log_size)
+                if is_truncated:
+                    truncated.append(name if host is None else f"{host}: {name}")
+                    log = f"[TRUNCATED]\n{log}"
+                attempts = ""
+                if result.attempts_info:
+                    attempts = f"<p>Attempts: {esc(result.attempts_info)}</p>\n"
+                f.write(
+                    f"<h{level}>{esc(name)}</h{level}>\n"
+                    f"<p>Status: <b>{result.status}</b></p>\n"
+                    f"{attempts}"
+                    f"<pre>{esc(log)}</pre>\n"
+                )
+                for collector, output in result.diagnostics.items():
+                    f.write(
+                        f"<h{level + 1}>Diagnostics ({esc(collector)})</h{level + 1}>\n"
+                        f"<pre>{esc(output)}</pre>\n"
+                    )
+    f.write("</body>\n</html>\n")
+    return truncated
 
-    report = "# Detailed report\n\n"
-    for name, result in check_suite.get_failing_results().items():
-        report += result.format_for_report(
-            name=name,
-            max_log_size=general_settings.max_log_size,
-        )
-    for name, result in check_suite.get_non_failing_results().items():
-        report += result.format_for_report(
-            name=name,
-            max_log_size=general_settings.max_log_size,
-        )
-    report = f"{report}End of report\n"
-
-    separator = "-" * 80 + "\n\n"
-    full_report = "".join(
-        (
-            summary,
-            separator,
-            recap,
-            separator,
-            report,
-            separator,
+
+_REPORT_WRITERS = {
+    "text": _write_text_report,
+    "json": _write_json_report,
+    "html": _write_html_report,
+}
+
+
+def write_report(
+    f: TextIO,
+    check_suite: CheckSuite,
+    checks_runtime: float,
+    instance_name: str | None,
+    general_settings: GeneralSettings,
+    report_format: ReportFormat = "text",
+    report_timestamp: datetime | None = None,
+    host_suites: dict[str, CheckSuite] | None = None,
+):
+    """
+    Write the results in a CheckSuite instance to the text stream `f`,
+    one section at a time.
+    It takes as argument also the time needed to run the checks.
+
+    Also reports the number of not succeeding checks, and lists failed
+    checks first. Each check log is truncated to `max_log_size`.
+
+    In fleet mode, `check_suite` holds the merged results and `host_suites`
+    the per-host ones, which are used for per-host sections of the text
+    report.
+    """
+    failing, remaining = _split_results(check_suite)
+    summary = {
+        "Fractal instance": instance_name,
+        "Report timestamp": report_timestamp or datetime.now(tz=timezone.utc),
+        "Fractal-healthcheck version": fractal_healthcheck.__VERSION__,
+        "Total number of checks": len(check_suite.checks),
+        "Number of failed checks": len(failing),
+        "Checks Runtime": f"{checks_runtime} seconds",
+    }
+    host_sections = None
+    if host_suites is not None:
+        summary["Number of hosts"] = len(host_suites)
+        host_sections = {
+            host: _split_results(host_suite) for host, host_suite in host_suites.items()
+        }
+    truncated = _REPORT_WRITERS[report_format](
+        f,
+        summary=summary,
+        failing=failing,
+        remaining=remaining,
+        max_log_size=general_settings.max_log_size,
+        host_sections=host_sections,
+    )
+    if truncated:
+        logger.warning(
+            f"[write_report] Logs of {len(truncated)} check(s) are larger than "
+            f"max_log_size={general_settings.max_log_size}, truncated: {truncated}"
         )
+
+
+def prepare_report(
+    check_suite: CheckSuite,
+    checks_runtime: float,
+    instance_name: str | None,
+    general_settings: GeneralSettings,
+    report_format: ReportFormat = "text",
+    report_timestamp: datetime | None = None,
+    host_suites: dict[str, CheckSuite] | None = None,
+) -> str:
+    """
+    Format the results in a CheckSuite instance to a string, see `write_report`.
+    """
+    buffer = io.StringIO()
+    write_report(
+        buffer,
+        check_suite=check_suite,
+        checks_runtime=checks_runtime,
+        instance_name=instance_name,
+        general_settings=general_settings,
+        report_format=report_format,
+        report_timestamp=report_timestamp,
+        host_suites=host_suites,
     )
+    return buffer.getvalue()
 
-    return full_report
 
+def prepare_diff_report(
+    check_suite: CheckSuite,
+    changes: dict[str, list[str]],
+    last_mail_info: LastMailStatus,
+    instance_name: str | None,
+    max_log_size: int = 20_000,
+) -> str:
+    """
+    Format a compact report with the changes since the previous run, and
+    the detailed sections of the checks which changed (newly failing,
+    recovered, or failing with a different output).
+    """
+    results = check_suite.get_results()
+    num_failing = sum(not result.success for result in results.values())
+    f = io.StringIO()
+    f.write(
+        "# Summary\n\n"
+        f"Fractal instance: {instance_name}\n"
+        f"Report timestamp: {datetime.now(tz=timezone.utc)}\n"
+        f"Total number of checks: {len(results)}\n"
+        f"Number of failed checks: {num_failing}\n"
+        "\n"
+    )
+    f.write(SEPARATOR)
 
-def report_to_file(report, filename):
+    f.write("# Changes since the previous run\n\n")
+    for title, key in (
+        ("Newly failing checks", "newly_failing"),
+        ("Recovered checks", "recovered"),
+        ("Failing checks with a new output", "changed_output"),
+    ):
+        f.write(f"{title}:\n")
+        for name in changes[key]:
+            f.write(f" * {name}\n")
+    f.write("Checks failing with the same output:\n")
+    for name in changes["still_failing"]:
+        f.write(f" * {name} (since {last_mail_info.checks[name]['since']})\n")
+    f.write("\n")
+    f.write(SEPARATOR)
+
+    f.write(f"{DETAILED_REPORT_HEADER} (changed checks only)\n\n")
+    for key in ("newly_failing", "changed_output", "recovered"):
+        for name in changes[key]:
+            results[name].write_for_report(f, name=name, max_log_size=max_log_size)
+    f.write("End of report\n")
+    f.write(SEPARATOR)
+    return f.getvalue()
+
+
+def report_to_file(
+    filename: str,
+    *,
+    check_suite: CheckSuite,
+    checks_runtime: float,
+    instance_name: str | None,
+    general_settings: GeneralSettings,
+    report_format: ReportFormat = "text",
+    report_timestamp: datetime | None = None,
+    host_suites: dict[str, CheckSuite] | None = None,
+):
     """
-    Append report to file.
+    Append report to file, writing it section by section.
+    With `filename="-"`, write to standard output instead.
     """
     logger.info(f"[report_to_file] START - {filename}")
-    with open(filename, "a") as f:
-        f.write(report)
+    with nullcontext(sys.stdout) if filename == "-" else open(filename, "a") as f:
+        write_report(
+            f,
+            check_suite=check_suite,
+            checks_runtime=checks_runtime,
+            instance_name=instance_name,
+            general_settings=general_settings,
+            report_format=report_format,
+            report_timestamp=report_timestamp,
+            host_suites=host_suites,
+        )
     logger.info("[report_to_file] END")
 
 
+def prepare_email(
+    body: str,
+    *,
+    subject: str,
+    mail_settings: MailSettings,
+) -> EmailMessage:
+    """
+    Build the email message. A body larger than `max_inline_size` is
+    attached as a gzip file, and only its sections before the detailed
+    report (summary, recap or changes) are kept inline.
+    """
+    msg = EmailMessage()
+    msg["From"] = mail_settings.sender
+    msg["To"] = ", ".join(mail_settings.recipients)
+    msg["Subject"] = subject
+    if len(body) <= mail_settings.max_inline_size:
+        msg.set_content(body)
+        return msg
+
+    inline = body.split(DETAILED_REPORT_HEADER, 1)[0]
+    msg.set_content(
+        f"{inline}The detailed report ({len(body)} characters) is attached.\n"
+    )
+    msg.add_attachment(
+        gzip.compress(body.encode("utf-8")),
+        maintype="application",
+        subtype="gzip",
+        filename="fractal-health-report.txt.gz",
+    )
+    logger.info(
+        f"[prepare_email] Report of {len(body)} characters is larger than "
+        f"max_inline_size={mail_settings.max_inline_size}, attach it."
+    )
+    return msg
+
+
+class SMTPSession:
+    """
+    SMTP connection (with optional STARTTLS and login) which can be reused
+    to send several emails, e.g. by a long-running caller. The connection is
+    opened lazily, and re-opened if the server closed it in the meantime.
+    """
+
+    def __init__(self, mail_settings: MailSettings):
+        self.mail_settings = mail_settings
+        self._server: smtplib.SMTP | None = None
+
+    def _connect(self) -> smtplib.SMTP:
+        mail_settings = self.mail_settings
+        server = smtplib.SMTP(
+            host=mail_settings.smtp_server,
+            port=mail_settings.smpt_server_port,
+            timeout=mail_settings.smtp_timeout_seconds,
+        )
+        server.ehlo()
+        if mail_settings.include_starttls:
+            server.starttls()
+            server.ehlo()
+        if mail_settings.include_login:
+            server.login(
+                user=mail_settings.sender,
+                password=mail_settings.password,
+                initial_response_ok=True,
+            )
+            logger.info("[SMTPSession] Successful login.")
+        else:
+            logger.info("[SMTPSession] No login attempted.")
+        return server
+
+    def _is_connected(self) -> bool:
+        if self._server is None:
+            return False
+        try:
+            return self._server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def send(self, msg: EmailMessage):
+        if not self._is_connected():
+            self.close()
+            self._server = self._connect()
+        self._server.sendmail(
+            from_addr=self.mail_settings.sender,
+            to_addrs=self.mail_settings.recipients,
+            msg=msg.as_string(),
+        )
+        logger.info("[SMTPSession] Email sent!")
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._server = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
 def report_to_email(
     *,
     check_suite: CheckSuite,
     report: str,
     mail_settings: MailSettings,
+    max_log_size: int = 20_000,
+    smtp_session: Optional["SMTPSession"] = None,
+    partial: bool = False,
 ):
     """
-    Send report by email.
+    Send report by email, through `smtp_session` if given (or through a
+    new SMTP connection otherwise).
+
+    An email is sent right away when a check starts failing or recovers;
+    otherwise, emails are rate-limited by the grace times. Unless
+    `email_body="full"`, the body only describes the changes since the
+    previous run. The state of each check is recorded in the status file at
+    every run; with `partial=True` (the suite only covers part of the
+    checks), the recorded state of other checks is kept.
     """
 
     logger.info("[report_to_email] START")
@@ -190,6 +649,8 @@ def report_to_email(
 
     status_file = mail_settings.status_file
     any_failing = check_suite.any_failing
+    results = check_suite.get_results()
+    changes = None
 
     try:
         with open(mail_settings.status_file, "r") as f:
@@ -208,7 +669,15 @@ def report_to_email(
                 f"[report_to_email] Last report email sent on {last_mail_info.last_email_timestamp} ({since_last} ago)"
             )
 
-        if any_failing:
+        changes = last_mail_info.diff(results)
+        if changes is not None and (changes["newly_failing"] or changes["recovered"]):
+            logger.info(
+                "[report_to_email] Will send email, reason: state changed, "
+                f"newly failing: {changes['newly_failing']}, "
+                f"recovered: {changes['recovered']}"
+            )
+            mail_reason = "WARNING" if any_failing else "RECOVERED"
+        elif any_failing:
             if since_last > timedelta(hours=mail_settings.grace_time_triggering_hours):
                 logger.info(
                     "[report_to_email] Will send email, reason: triggering, and enough time elapsed"
@@ -241,43 +710,38 @@ def report_to_email(
         mail_reason = "First report"
 
     if mail_reason is None:
+        last_mail_info.update_checks(results, partial=partial)
+        atomic_write(status_file, last_mail_info.to_yaml(None))
         logger.info("[report_to_email] Exit.")
         return
 
     logger.info(f"[report_to_email] I will send an email, with {mail_reason=}")
 
     # (2/3) Prepare email
-    msg = EmailMessage()
-    msg["From"] = mail_settings.sender
-    msg["To"] = ", ".join(mail_settings.recipients)
-    msg["Subject"] = f"[Fractal, {mail_settings.instance_name}] {mail_reason}"
-    msg.set_content(report)
+    if mail_settings.email_body == "diff" and changes is not None:
+        body = prepare_diff_report(
+            check_suite,
+            changes=changes,
+            last_mail_info=last_mail_info,
+            instance_name=mail_settings.instance_name,
+            max_log_size=max_log_size,
+        )
+    else:
+        body = report
+    msg = prepare_email(
+        body,
+        subject=f"[Fractal, {mail_settings.instance_name}] {mail_reason}",
+        mail_settings=mail_settings,
+    )
 
     # (3/3) Send email and update timestamp
-    with smtplib.SMTP(
-        host=mail_settings.smtp_server, port=mail_settings.smpt_server_port
-    ) as server:
-        server.ehlo()
-        if mail_settings.include_starttls:
-            server.starttls()
-            server.ehlo()
-        if mail_settings.include_login:
-            server.login(
-                user=mail_settings.sender,
-                password=mail_settings.password,
-                initial_response_ok=True,
-            )
-            logger.info("[report_to_email] Successful login.")
-        else:
-            logger.info("[report_to_email] No login attempted.")
-        server.sendmail(
-            from_addr=mail_settings.sender,
-            to_addrs=mail_settings.recipients,
-            msg=msg.as_string(),
-        )
-        logger.info("[report_to_email] Email sent!")
-        with open(status_file, "w") as f:
-            last_mail_info.update()
-            last_mail_info.to_yaml(f)
-        logger.info(f"[report_to_email] {status_file} updated")
+    if smtp_session is None:
+        with SMTPSession(mail_settings) as session:
+            session.send(msg)
+    else:
+        smtp_session.send(msg)
+    last_mail_info.update()
+    last_mail_info.update_checks(results, partial=partial)
+    atomic_write(status_file, last_mail_info.to_yaml(None))
+    logger.info(f"[report_to_email] {status_file} updated")
     logger.info("[report_to_email] END")
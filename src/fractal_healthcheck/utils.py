@@ -0,0 +1,23 @@
+import os
+import tempfile
+
+
+def atomic_write(filename: str, content: str):
+    """
+    Replace `filename` with `content` atomically: write a temporary file in
+    the same folder, and rename it over the target. Concurrent readers see
+    either the old or the new content, never a partial file.
+    """
+    dirname = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_filename = tempfile.mkstemp(
+        dir=dirname, prefix=f".{os.path.basename(filename)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        os.unlink(tmp_filename)
+        raise
@@ -0,0 +1,33 @@
+import os
+import stat
+import sys
+from pathlib import Path
+from typing import Callable
+
+import pytest
+
+
+def write_executable(bindir: Path, name: str, source: str) -> Path:
+    """
+    Write the Python `source` as an executable script `name` in `bindir`.
+    """
+    bindir.mkdir(parents=True, exist_ok=True)
+    script = bindir / name
+    script.write_text(f"#!{sys.executable}\n{source}")
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return script
+
+
+@pytest.fixture
+def fake_executable(tmp_path, monkeypatch) -> Callable[[str, str], Path]:
+    """
+    Factory of fake executables (Python scripts, via `write_executable`),
+    in a folder which comes first in `PATH`.
+    """
+    bindir = tmp_path / "bin"
+    monkeypatch.setenv("PATH", f"{bindir}{os.pathsep}{os.environ['PATH']}")
+
+    def _fake_executable(name: str, source: str) -> Path:
+        return write_executable(bindir, name, source)
+
+    return _fake_executable
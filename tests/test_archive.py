@@ -0,0 +1,84 @@
+import gzip
+from datetime import datetime
+from datetime import timedelta
+from datetime import timezone
+
+from click.testing import CliRunner
+
+from fractal_healthcheck.archive import ArchiveSettings
+from fractal_healthcheck.archive import ReportArchive
+from fractal_healthcheck.main import cli
+
+
+def test_report_archive(tmp_path):
+    archive = ReportArchive(
+        ArchiveSettings(
+            directory=(tmp_path / "archive").as_posix(),
+            max_segment_bytes=10_000,
+            max_segment_age_hours=0.9,
+            max_segments=2,
+        )
+    )
+    t0 = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    for ind in range(8):
+        archive.add(
+            f"Report {ind}\n",
+            timestamp=t0 + timedelta(minutes=20 * ind),
+            status="FAIL" if ind % 3 == 0 else "PASS",
+        )
+
+    # Segments rotate every hour, and only the last two are kept
+    segments = sorted(p.name for p in archive.directory.glob("*.gz"))
+    assert segments == ["reports-20260101T010000.gz", "reports-20260101T020000.gz"]
+    index = archive.read_index()
+    assert [entry["segment"] for entry in index] == [segments[0]] * 3 + [
+        segments[1]
+    ] * 2
+    # Each segment is a valid gzip file
+    with gzip.open(archive.directory / segments[0], "rt") as f:
+        assert f.read() == "Report 3\nReport 4\nReport 5\n"
+
+    assert archive.read(archive.lookup()) == "Report 7\n"
+    entry = archive.lookup(at=t0 + timedelta(minutes=110))
+    assert archive.read(entry) == "Report 5\n"
+    entry = archive.lookup(at=t0 + timedelta(minutes=110), failing_only=True)
+    assert archive.read(entry) == "Report 3\n"
+    assert archive.lookup(at=t0) is None
+
+
+def test_cli_archive_and_show(tmp_path):
+    archive_dir = tmp_path / "archive"
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        "checks:\n"
+        "  - name: whoami\n"
+        "    function_name: subprocess_run\n"
+        "    kwargs:\n"
+        "      command: whoami\n"
+        "general-config:\n"
+        "  archive:\n"
+        f"    directory: {archive_dir.as_posix()}\n"
+    )
+    runner = CliRunner()
+    # `run` is the default subcommand
+    for args in ([config_file.as_posix()], ["run", config_file.as_posix()]):
+        result = runner.invoke(cli, args=args)
+        assert result.exit_code == 0, result.output
+    archive = ReportArchive(ArchiveSettings(directory=archive_dir.as_posix()))
+    assert len(archive.read_index()) == 2
+
+    result = runner.invoke(cli, args=["show", "-d", archive_dir.as_posix()])
+    assert result.exit_code == 0
+    assert "Check: whoami\nStatus: PASS\n" in result.output
+
+    result = runner.invoke(
+        cli, args=["show", "-d", archive_dir.as_posix(), "--at", "2000-01-01"]
+    )
+    assert result.exit_code == 1
+    assert "No matching report" in result.output
+
+    result = runner.invoke(
+        cli, args=["show", "-d", archive_dir.as_posix(), "--at", "yesterday"]
+    )
+    assert result.exit_code == 2
+    assert "Invalid value for '--at': 'yesterday' is not an ISO time" in result.output
@@ -0,0 +1,47 @@
+import subprocess
+import sys
+
+import pytest
+
+from fractal_healthcheck.checks.capture import BoundedOutput
+from fractal_healthcheck.checks.capture import capture_run
+
+
+def test_bounded_output():
+    out = BoundedOutput(head_bytes=4, tail_bytes=4)
+    for chunk in (b"0123", b"45\n67", b"89\nab"):
+        out.feed(chunk)
+    assert out.total_bytes == 14
+    assert out.total_lines == 3
+    assert out.head == b"0123"
+    assert out.tail == b"89\nab"[-4:]
+    assert out.omitted_bytes == 6
+    assert "6 bytes omitted" in out.text
+
+    out = BoundedOutput(head_bytes=100, tail_bytes=100)
+    out.feed(b"a\nb\n")
+    assert not out.truncated
+    assert out.text == "a\nb\n"
+    assert out.total_lines == 2
+
+    out = BoundedOutput(keep_output=False)
+    out.feed(b"a\nb\nc")
+    assert out.total_lines == 3
+    assert out.head == b""
+
+
+def test_capture_run():
+    code = "import sys; [print(i) for i in range(200_000)]"
+    res = capture_run([sys.executable, "-c", code], head_bytes=100, tail_bytes=100)
+    assert res.returncode == 0
+    assert res.stdout.total_lines == 200_000
+    assert len(res.stdout.head) + len(res.stdout.tail) == 200
+    assert res.stdout.text.startswith("0\n1\n")
+    assert res.stdout.text.endswith("199999\n")
+
+    with pytest.raises(subprocess.CalledProcessError) as e:
+        capture_run([sys.executable, "-c", "import sys; sys.exit('boom')"], check=True)
+    assert "boom" in e.value.stderr
+
+    with pytest.raises(subprocess.TimeoutExpired):
+        capture_run([sys.executable, "-c", "import time; time.sleep(10)"], timeout=0.2)
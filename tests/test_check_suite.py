@@ -0,0 +1,406 @@
+import sys
+import time
+from importlib.metadata import EntryPoint
+
+import pytest
+from pydantic import ValidationError
+
+from fractal_healthcheck.checks import Check
+from fractal_healthcheck.checks import CheckSuite
+from fractal_healthcheck.checks import dependency_waves
+from fractal_healthcheck.checks import registry
+from fractal_healthcheck.checks.history import CheckHistory
+from fractal_healthcheck.profiling import Profiler
+
+
+def test_run_parallel():
+    suite = CheckSuite(
+        checks=[
+            Check(
+                name=f"Command {ind}",
+                function_name="subprocess_run",
+                kwargs=dict(command=f"echo {ind}"),
+            )
+            for ind in range(10)
+        ]
+    )
+    suite.run(max_workers=4)
+    assert not suite.any_failing
+    assert [c.result.log for c in suite.checks] == [f"{ind}\n" for ind in range(10)]
+
+
+def test_run_with_profiler(tmp_path):
+    suite = CheckSuite(
+        checks=[
+            Check(name="Processes", function_name="count_processes"),
+            Check(name="Memory", function_name="memory_usage"),
+        ]
+    )
+    profiler = Profiler(tmp_path / "profile", top_n=5)
+    profiler.start()
+    suite.run(max_workers=4, profiler=profiler)
+    profiler.stop()
+    assert not suite.any_failing
+    assert sorted(p.name for p in (tmp_path / "profile").glob("*.pstats")) == [
+        "000-check-processes.pstats",
+        "001-check-memory.pstats",
+    ]
+    summary = (tmp_path / "profile" / "summary.txt").read_text()
+    assert "check Memory" in summary
+    assert "Top 5 functions by cumulative time (checks)" in summary
+
+
+def test_dependencies():
+    suite = CheckSuite(
+        checks=[
+            Check(
+                name="Dependent",
+                function_name="subprocess_run",
+                kwargs=dict(command="echo dependent"),
+                depends_on=["Broken mount"],
+            ),
+            Check(
+                name="Broken mount",
+                function_name="check_mounts",
+                kwargs=dict(mounts=["/this/does/not/exist"]),
+            ),
+            Check(
+                name="Indirect",
+                function_name="subprocess_run",
+                kwargs=dict(command="echo indirect"),
+                depends_on=["Dependent"],
+            ),
+            Check(
+                name="Independent",
+                function_name="subprocess_run",
+                kwargs=dict(command="echo independent"),
+            ),
+        ]
+    )
+    assert [[c.name for c in wave] for wave in dependency_waves(suite.checks)] == [
+        ["Broken mount", "Independent"],
+        ["Dependent"],
+        ["Indirect"],
+    ]
+    suite.run(max_workers=2)
+    statuses = {c.name: c.result.status for c in suite.checks}
+    assert statuses == {
+        "Dependent": "SKIPPED",
+        "Broken mount": "FAIL",
+        "Indirect": "SKIPPED",
+        "Independent": "PASS",
+    }
+
+
+def test_invalid_dependencies():
+    def _check(name, depends_on):
+        return dict(name=name, function_name="count_processes", depends_on=depends_on)
+
+    with pytest.raises(ValidationError, match="unknown checks"):
+        CheckSuite(checks=[_check("a", ["missing"])])
+    with pytest.raises(ValidationError, match="Cycle"):
+        CheckSuite(checks=[_check("a", ["b"]), _check("b", ["a"]), _check("c", [])])
+
+
+def test_deadline_and_history(tmp_path):
+    suite = CheckSuite(
+        checks=[
+            Check(
+                name="Slow",
+                function_name="subprocess_run",
+                kwargs=dict(command="sleep 2"),
+            ),
+            Check(
+                name="Fast",
+                function_name="subprocess_run",
+                kwargs=dict(command="echo fast"),
+            ),
+            Check(
+                name="After slow",
+                function_name="subprocess_run",
+                kwargs=dict(command="echo after"),
+                depends_on=["Slow"],
+            ),
+        ]
+    )
+    history = CheckHistory(checks={"Fast": {"durations": [0.1]}})
+    t_start = time.perf_counter()
+    suite.run(max_workers=1, deadline_seconds=0.5, history=history)
+    assert time.perf_counter() - t_start < 1.5
+    results = suite.get_results()
+    assert results["Slow"].status == "TIMEOUT"
+    assert "Not completed" in results["Slow"].log
+    assert results["Fast"].status == "TIMEOUT"
+    assert "Not started" in results["Fast"].log
+    assert results["After slow"].status == "TIMEOUT"
+
+    history.update(results)
+    history_file = (tmp_path / "history.json").as_posix()
+    history.to_file(history_file)
+    history = CheckHistory.from_file(history_file)
+    assert history.expected_duration("Fast") == 0.1
+    assert history.expected_duration("Slow") >= 0.5
+    assert history.expected_duration("After slow") is None
+
+
+def test_retry(tmp_path):
+    # Fails on the first attempt only
+    marker = tmp_path / "marker"
+    command = f"sh -c 'test -e {marker} || (touch {marker} && exit 1)'"
+    retry = dict(attempts=3, backoff_seconds=0.01)
+    suite = CheckSuite(
+        checks=[
+            Check(
+                name="Flaky",
+                function_name="subprocess_run",
+                kwargs=dict(command=command),
+                retry=retry,
+            ),
+            Check(
+                name="Broken",
+                function_name="subprocess_run",
+                kwargs=dict(command="false"),
+                retry=retry,
+            ),
+            Check(
+                name="Out of budget",
+                function_name="subprocess_run",
+                kwargs=dict(command="false"),
+                retry=dict(attempts=3, backoff_seconds=10, budget_seconds=1),
+            ),
+        ]
+    )
+    history = CheckHistory()
+    suite.run(max_workers=3)
+    history.update(suite.get_results())
+    results = suite.get_results()
+    assert results["Flaky"].success
+    assert results["Flaky"].attempts == 2
+    assert results["Flaky"].flakiness == 1.0
+    assert not results["Broken"].success
+    assert results["Broken"].attempts == 3
+    assert results["Broken"].flakiness == 0.0
+    assert results["Out of budget"].attempts == 1
+    assert "Attempts: 2 (flakiness over recent runs: 100%)" in results[
+        "Flaky"
+    ].format_for_report(name="Flaky", max_log_size=100)
+
+
+def test_matrix():
+    suite = CheckSuite(
+        checks=[
+            {
+                "name": "Check mounts",
+                "function_name": "check_mounts",
+                "kwargs": {"mounts": ["/tmp"]},
+            },
+            {
+                "name": "Storage usage in {mountpoint}",
+                "function_name": "disk_usage",
+                "kwargs": {"max_perc_usage": 100},
+                "matrix": {"mountpoint": ["/", "/tmp"]},
+                "depends_on": ["Check mounts"],
+            },
+            {
+                "name": "Echo",
+                "function_name": "subprocess_run",
+                "matrix": {"command": ["echo a", "echo b"]},
+            },
+        ]
+    )
+    assert [c.name for c in suite.checks] == [
+        "Check mounts",
+        "Storage usage in /",
+        "Storage usage in /tmp",
+        "Echo [command=echo a]",
+        "Echo [command=echo b]",
+    ]
+    assert suite.checks[2].kwargs == {"max_perc_usage": 100, "mountpoint": "/tmp"}
+    assert suite.checks[2].depends_on == ["Check mounts"]
+
+    # Expanded names must still be unique
+    with pytest.raises(ValidationError, match="Non-unique"):
+        CheckSuite(
+            checks=[
+                {
+                    "name": "Echo",
+                    "function_name": "subprocess_run",
+                    "matrix": {"command": ["echo a", "echo a"]},
+                },
+            ]
+        )
+    with pytest.raises(ValidationError, match="not a list"):
+        CheckSuite(
+            checks=[
+                {
+                    "name": "Echo",
+                    "function_name": "subprocess_run",
+                    "matrix": {"command": "echo a"},
+                },
+            ]
+        )
+    for name, depends_on in [("Echo {foo}", []), ("Echo", ["Other {}"])]:
+        with pytest.raises(ValidationError, match="is not a matrix key"):
+            CheckSuite(
+                checks=[
+                    {
+                        "name": name,
+                        "function_name": "subprocess_run",
+                        "matrix": {"command": ["echo a"]},
+                        "depends_on": depends_on,
+                    },
+                ]
+            )
+
+    # Large matrices
+    suite = CheckSuite(
+        checks=[
+            {
+                "name": "Echo {a}-{b}",
+                "function_name": "subprocess_run",
+                "matrix": {"a": list(range(100)), "b": list(range(50))},
+            }
+        ]
+    )
+    assert len(suite.checks) == 5000
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_batch(monkeypatch, max_workers):
+    from fractal_healthcheck.checks import implementations
+    from fractal_healthcheck.checks.CheckResults import CheckResult
+
+    calls = []
+
+    def fake_batch(kwargs_list):
+        calls.append(kwargs_list)
+        return [
+            CheckResult(log=kwargs["command"], success=kwargs["command"] != "false")
+            for kwargs in kwargs_list
+        ]
+
+    monkeypatch.setattr(
+        implementations, "BATCH_FUNCTIONS", {"subprocess_run": fake_batch}
+    )
+    suite = CheckSuite(
+        checks=[
+            {
+                "name": "Command",
+                "function_name": "subprocess_run",
+                "matrix": {"command": ["true", "echo b", "false"]},
+            },
+            {"name": "Processes", "function_name": "count_processes"},
+        ]
+    )
+    suite.run(max_workers=max_workers)
+    assert len(calls) == 1
+    assert [c.result.log for c in suite.checks[:3]] == ["true", "echo b", "false"]
+    assert [c.result.status for c in suite.checks] == ["PASS", "PASS", "FAIL", "PASS"]
+    assert all(c.result.runtime is not None for c in suite.checks)
+
+    # With a deadline, checks are not batched
+    suite.run(max_workers=max_workers, deadline_seconds=10)
+    assert len(calls) == 1
+    assert [c.result.status for c in suite.checks] == ["PASS", "PASS", "FAIL", "PASS"]
+    assert suite.checks[1].result.log == "b\n"
+
+
+def test_url_json_batch():
+    import http.server
+    import threading
+
+    from fractal_healthcheck.checks.implementations import url_json_batch
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.startswith("/slow"):
+                time.sleep(0.5)
+            status = 200 if self.path.startswith(("/ok", "/slow")) else 500
+            body = b'{"ok": true}'
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        url = f"http://127.0.0.1:{server.server_port}"
+        results = url_json_batch([{"url": f"{url}/ok"}, {"url": f"{url}/ko"}])
+        # Requests run concurrently, and are bounded by their timeout
+        t_start = time.perf_counter()
+        slow_results = url_json_batch(
+            [{"url": f"{url}/slow/{ind}"} for ind in range(4)]
+            + [{"url": f"{url}/slow/timeout", "timeout_seconds": 0.2}]
+        )
+        assert time.perf_counter() - t_start < 1.5
+    finally:
+        server.shutdown()
+    assert [r.success for r in results] == [True, False]
+    assert '"ok": true' in results[0].log
+    assert [r.success for r in slow_results] == [True] * 4 + [False]
+
+
+def test_plugins(tmp_path, monkeypatch):
+    (tmp_path / "my_plugin.py").write_text(
+        "from fractal_healthcheck.checks.CheckResults import CheckResult\n"
+        "def my_check(value):\n"
+        "    return CheckResult(log=f'value={value}')\n"
+    )
+    monkeypatch.syspath_prepend(tmp_path)
+    entry_point = EntryPoint(
+        name="my_check",
+        value="my_plugin:my_check",
+        group=registry.ENTRY_POINT_GROUP,
+    )
+    monkeypatch.setattr(
+        registry, "_plugin_entry_points", lambda: {"my_check": entry_point}
+    )
+    registry.get_check_function.cache_clear()
+
+    suite = CheckSuite(
+        checks=[
+            Check(name="Plugin", function_name="my_check", kwargs=dict(value=1)),
+            Check(name="Built-in", function_name="count_processes"),
+        ]
+    )
+    # Plugins are only imported when their checks run
+    assert "my_plugin" not in sys.modules
+    suite.run()
+    assert "my_plugin" in sys.modules
+    assert suite.checks[0].result.log == "value=1"
+    assert suite.checks[1].result.success
+
+    for function_name in [
+        "missing_check",
+        "_url_json",
+        "BATCH_FUNCTIONS",
+        "CheckResult",
+        "create_table",
+        "capture_run",
+        "url_json_batch",
+    ]:
+        with pytest.raises(ValidationError, match="Unknown check function"):
+            Check(name="Unknown", function_name=function_name)
+    registry.get_check_function.cache_clear()
+
+
+def test_history_metrics():
+    from fractal_healthcheck.checks.CheckResults import CheckResult
+
+    history = CheckHistory()
+    for ind in range(5):
+        results = {
+            name: CheckResult(runtime=0.1, metrics={"percent": ind, "used_gb": ind})
+            for name in ("Tracked", "Untracked")
+        }
+        history.update(results, tracked_metrics={"Tracked": ("percent", 3)})
+    assert history.metric_series("Tracked", "percent")[1] == [2, 3, 4]
+    assert history.metric_series("Tracked", "used_gb") == ([], [])
+    assert "metrics" not in history.checks["Untracked"]
+    # Series of metrics which are no longer tracked are dropped
+    history.update(results)
+    assert "metrics" not in history.checks["Tracked"]
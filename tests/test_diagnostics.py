@@ -0,0 +1,103 @@
+import time
+
+import pytest
+from pydantic import ValidationError
+
+from fractal_healthcheck.checks import Check
+from fractal_healthcheck.checks import CheckSuite
+from fractal_healthcheck.checks import diagnostics
+
+
+def test_diagnostics(monkeypatch):
+    def slow(timeout: float, max_bytes: int) -> str:
+        time.sleep(2)
+        return "never"
+
+    def verbose(timeout: float, max_bytes: int, line: str) -> str:
+        return line * 1000
+
+    monkeypatch.setitem(diagnostics.COLLECTORS, "slow", slow)
+    monkeypatch.setitem(diagnostics.COLLECTORS, "verbose", verbose)
+    settings = dict(
+        collectors=dict(
+            mounts={}, slow={}, verbose=dict(line="x\n"), journal_errors={}
+        ),
+        timeout_seconds=0.5,
+        max_output_bytes=100,
+    )
+    suite = CheckSuite(
+        checks=[
+            Check(
+                name="Failing",
+                function_name="subprocess_run",
+                kwargs=dict(command="false"),
+                diagnostics=settings,
+            ),
+            Check(
+                name="Passing",
+                function_name="subprocess_run",
+                kwargs=dict(command="true"),
+                diagnostics=settings,
+            ),
+        ]
+    )
+    t_start = time.perf_counter()
+    suite.run()
+    assert time.perf_counter() - t_start < 2
+
+    failing, passing = suite.checks
+    assert passing.result.diagnostics == {}
+    outputs = failing.result.diagnostics
+    assert list(outputs) == ["mounts", "slow", "verbose", "journal_errors"]
+    assert outputs["slow"] == "[Not completed within 0.5 seconds]"
+    assert outputs["verbose"].startswith("[TRUNCATED]\n")
+    assert len(outputs["verbose"]) <= 100 + len("[TRUNCATED]\n")
+    # Either the journal, or the error of `journalctl`
+    assert outputs["journal_errors"]
+
+    report = failing.result.format_for_report("Failing", max_log_size=1000)
+    assert "Diagnostics (slow):\n> [Not completed within 0.5 seconds]\n" in report
+
+
+def test_invalid_diagnostics():
+    with pytest.raises(ValidationError, match="Unknown diagnostic collectors"):
+        Check(
+            name="Check",
+            function_name="count_processes",
+            diagnostics=dict(collectors=["dmesg", "missing"]),
+        )
+    check = Check(
+        name="Check",
+        function_name="count_processes",
+        diagnostics=dict(collectors=["dmesg", "df_inodes"]),
+    )
+    assert check.diagnostics.collectors == {"dmesg": {}, "df_inodes": {}}
+    with pytest.raises(ValidationError, match="Invalid kwargs .* 'journal_errors'"):
+        Check(
+            name="Check",
+            function_name="count_processes",
+            diagnostics=dict(collectors=dict(journal_errors=dict(unit="nginx"))),
+        )
+    with pytest.raises(ValidationError, match="Invalid kwargs .* 'postgres_activity'"):
+        Check(
+            name="Check",
+            function_name="count_processes",
+            diagnostics=dict(collectors=["postgres_activity"]),
+        )
+    with pytest.raises(ValidationError, match="Invalid kwargs .* 'dmesg'"):
+        Check(
+            name="Check",
+            function_name="count_processes",
+            diagnostics=dict(collectors=dict(dmesg=dict(timeout=1))),
+        )
+    check = Check(
+        name="Check",
+        function_name="count_processes",
+        diagnostics=dict(
+            collectors=dict(
+                journal_errors=dict(units=["nginx"]),
+                postgres_activity=dict(dbname="fractal", port=5433),
+            )
+        ),
+    )
+    assert check.diagnostics.collectors["postgres_activity"]["port"] == 5433
@@ -0,0 +1,140 @@
+import json
+import subprocess
+from types import SimpleNamespace
+
+import pytest
+
+from fractal_healthcheck.fleet import FleetSettings
+from fractal_healthcheck.fleet import merge_fleet_results
+from fractal_healthcheck.fleet import run_fleet
+from fractal_healthcheck.report import GeneralSettings
+from fractal_healthcheck.report import prepare_report
+
+
+class LocalConnection:
+    """
+    Stand-in for `fabric.Connection`, running commands locally.
+    """
+
+    def __init__(self, host, user, port, forward_agent):
+        self.host = host
+        self.connect_kwargs = {}
+
+    def run(self, command, hide, timeout):
+        if self.host == "down":
+            raise ConnectionRefusedError("Connection refused")
+        res = subprocess.run(
+            command, shell=True, capture_output=True, encoding="utf-8", timeout=timeout
+        )
+        return SimpleNamespace(stdout=res.stdout)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def local_connection(monkeypatch):
+    monkeypatch.setattr("fractal_healthcheck.fleet.Connection", LocalConnection)
+
+
+def test_run_fleet(tmp_path, local_connection):
+    config_ok = tmp_path / "ok.yaml"
+    config_ok.write_text(
+        "checks:\n"
+        "  - name: whoami\n"
+        "    function_name: subprocess_run\n"
+        "    kwargs:\n"
+        "      command: whoami\n"
+    )
+    config_fail = tmp_path / "fail.yaml"
+    config_fail.write_text(
+        "checks:\n"
+        "  - name: fails\n"
+        "    function_name: subprocess_run\n"
+        "    kwargs:\n"
+        "      command: 'false'\n"
+    )
+    hosts = [
+        dict(host=host, username="user", password="pass", config_file=config)
+        for host, config in (
+            ("login1", config_ok.as_posix()),
+            ("worker1", config_fail.as_posix()),
+            ("down", config_ok.as_posix()),
+        )
+    ]
+    settings = FleetSettings(hosts=hosts, max_concurrency=2)
+    host_suites = run_fleet(settings)
+    assert list(host_suites) == ["login1", "worker1", "down"]
+    assert not host_suites["login1"].any_failing
+    assert host_suites["worker1"].any_failing
+    assert "Connection refused" in host_suites["down"].checks[0].result.full_log
+
+    merged = merge_fleet_results(host_suites)
+    assert [c.name for c in merged.checks] == [
+        "login1: whoami",
+        "worker1: fails",
+        "down: Fleet run",
+    ]
+    report = prepare_report(
+        merged,
+        checks_runtime=1.0,
+        instance_name="MyFleet",
+        general_settings=GeneralSettings(),
+        host_suites=host_suites,
+    )
+    assert "Number of hosts: 3" in report
+    assert "Number of failed checks: 2" in report
+    assert report.index("## Host: login1") < report.index("## Host: worker1")
+
+    report_kwargs = dict(
+        checks_runtime=1.0,
+        instance_name="MyFleet",
+        general_settings=GeneralSettings(),
+        host_suites=host_suites,
+    )
+    html_report = prepare_report(merged, report_format="html", **report_kwargs)
+    assert html_report.count("<h2>Host: ") == 3
+    assert html_report.index("<h2>Host: login1</h2>\n<h3>whoami</h3>") < (
+        html_report.index("<h2>Host: worker1</h2>\n<h3>fails</h3>")
+    )
+    json_report = json.loads(
+        prepare_report(merged, report_format="json", **report_kwargs)
+    )
+    assert [(c["host"], c["name"]) for c in json_report["checks"]] == [
+        ("login1", "login1: whoami"),
+        ("worker1", "worker1: fails"),
+        ("down", "down: Fleet run"),
+    ]
+
+
+def test_fleet_settings_validation():
+    with pytest.raises(ValueError, match="exactly one"):
+        FleetSettings(hosts=[dict(host="a", username="u", config_file="c")])
+
+
+def test_parse_json_report():
+    from fractal_healthcheck.checks import Check
+    from fractal_healthcheck.checks import CheckSuite
+    from fractal_healthcheck.checks.CheckResults import CheckResult
+    from fractal_healthcheck.fleet import parse_json_report
+
+    results = [
+        CheckResult(log="ok", runtime=0.5, metrics={"percent": 10.0}),
+        CheckResult(exception=ValueError("broken"), success=False, runtime=1.5),
+        CheckResult(log="skipped", success=False, skipped=True),
+    ]
+    suite = CheckSuite(
+        checks=[
+            Check(name=f"Check {ind}", function_name="count_processes", result=result)
+            for ind, result in enumerate(results)
+        ]
+    )
+    report = prepare_report(
+        suite,
+        checks_runtime=1.0,
+        instance_name=None,
+        general_settings=GeneralSettings(),
+        report_format="json",
+    )
+    parsed = parse_json_report(report).get_results()
+    assert parsed == {f"Check {ind}": result for ind, result in enumerate(results)}
@@ -172,3 +172,202 @@ def test_check_postgresql_db_info(mock_pg_connection):
     )
 
     assert result.success is True
+
+
+def test_trends_without_numpy(tmp_path: Path, monkeypatch, caplog):
+    import sys
+
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    monkeypatch.delitem(sys.modules, "fractal_healthcheck.checks.trends", False)
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        "general-config:\n"
+        f"  history_file: {(tmp_path / 'history.json').as_posix()}\n"
+        "checks:\n"
+        "  - name: Disk usage\n"
+        "    function_name: disk_usage\n"
+        "    trend:\n"
+        "      metric: percent\n"
+        "      max_zscore: 3\n"
+    )
+    report_file = tmp_path / "report.txt"
+    result = CliRunner().invoke(
+        main, args=[config_file.as_posix(), "-o", report_file.as_posix()]
+    )
+    assert result.exit_code == 0
+    assert "Trend detection requires the `trends` extra" in caplog.text
+    assert "Check: Disk usage" in report_file.read_text()
+
+
+def test_deadline_exit_time(tmp_path: Path):
+    import subprocess
+    import sys
+    import time
+
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        "general-config:\n"
+        "  deadline_seconds: 1\n"
+        f"  lock_file: {(tmp_path / 'lock').as_posix()}\n"
+        "checks:\n"
+        "  - name: Hanging\n"
+        "    function_name: subprocess_run\n"
+        "    kwargs:\n"
+        "      command: sleep 6\n"
+    )
+    report_file = tmp_path / "report.txt"
+    t_start = time.perf_counter()
+    res = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "fractal_healthcheck.main",
+            config_file.as_posix(),
+            "-o",
+            report_file.as_posix(),
+        ],
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+    assert time.perf_counter() - t_start < 4
+    assert res.returncode == 0
+    assert "Exit without waiting for ['Hanging']" in res.stderr
+    assert "Status: TIMEOUT" in report_file.read_text()
+
+
+def test_profile_with_deadline(tmp_path: Path, caplog):
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        "general-config:\n"
+        "  deadline_seconds: 0.5\n"
+        "checks:\n"
+        "  - name: Slow\n"
+        "    function_name: subprocess_run\n"
+        "    kwargs:\n"
+        "      command: sleep 1\n"
+    )
+    report_file = tmp_path / "report.txt"
+    result = CliRunner().invoke(
+        main,
+        args=[config_file.as_posix(), "-o", report_file.as_posix(), "--profile"],
+    )
+    assert result.exit_code == 0, result.output
+    assert "Profiling is enabled, the deadline is ignored." in caplog.text
+    assert "Status: PASS" in report_file.read_text()
+    assert len(list(tmp_path.glob("fractal-health-profile-*/*.pstats"))) == 2
+
+
+def _write_locked_config(tmp_path: Path, on_locked: str) -> Path:
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        "general-config:\n"
+        f"  lock_file: {(tmp_path / 'lock').as_posix()}\n"
+        f"  on_locked: {on_locked}\n"
+        "checks:\n"
+        "  - name: Uptime\n"
+        "    function_name: subprocess_run\n"
+        "    kwargs:\n"
+        "      command: uptime\n"
+    )
+    return config_file
+
+
+def test_on_locked_exit(tmp_path: Path, caplog):
+    from fractal_healthcheck.lock import RunLock
+
+    config_file = _write_locked_config(tmp_path, on_locked="exit")
+    report_file = tmp_path / "report.txt"
+    previous_run = RunLock((tmp_path / "lock").as_posix())
+    assert previous_run.acquire()
+    try:
+        result = CliRunner().invoke(
+            main, args=[config_file.as_posix(), "-o", report_file.as_posix()]
+        )
+    finally:
+        previous_run.release()
+    assert result.exit_code == 0, result.output
+    assert "Previous run still in progress (pid" in caplog.text
+    assert not report_file.exists()
+
+
+def test_on_locked_report(tmp_path: Path):
+    from fractal_healthcheck.lock import RunLock
+
+    config_file = _write_locked_config(tmp_path, on_locked="report")
+    report_file = tmp_path / "report.txt"
+    previous_run = RunLock((tmp_path / "lock").as_posix())
+    assert previous_run.acquire()
+    try:
+        result = CliRunner().invoke(
+            main, args=[config_file.as_posix(), "-o", report_file.as_posix()]
+        )
+    finally:
+        previous_run.release()
+    assert result.exit_code == 0, result.output
+    report = report_file.read_text()
+    assert "Total number of checks: 1" in report
+    assert "Previous run still in progress (pid" in report
+    assert "Status: FAIL" in report
+    assert "Uptime" not in report
+
+    # Once the lock is free, checks run as usual
+    report_file = tmp_path / "next-report.txt"
+    result = CliRunner().invoke(
+        main, args=[config_file.as_posix(), "-o", report_file.as_posix()]
+    )
+    assert result.exit_code == 0, result.output
+    report = report_file.read_text()
+    assert "Uptime" in report
+    assert "Previous run" not in report
+
+
+def test_lock_held_past_deadline(tmp_path: Path):
+    import subprocess
+    import sys
+    import time
+
+    from fractal_healthcheck.lock import RunLock
+
+    lock_file = (tmp_path / "lock").as_posix()
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(
+        "general-config:\n"
+        "  deadline_seconds: 2\n"
+        f"  lock_file: {lock_file}\n"
+        "checks:\n"
+        "  - name: Hanging\n"
+        "    function_name: subprocess_run\n"
+        "    kwargs:\n"
+        "      command: sleep 6\n"
+    )
+    run = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "fractal_healthcheck.main",
+            config_file.as_posix(),
+            "-o",
+            (tmp_path / "report.txt").as_posix(),
+        ],
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        # Wait for the run to take the lock
+        t_start = time.perf_counter()
+        while (
+            not (tmp_path / "lock").exists() or not (tmp_path / "lock").stat().st_size
+        ):
+            assert time.perf_counter() - t_start < 10
+            time.sleep(0.05)
+        assert not RunLock(lock_file).acquire()
+        _, stderr = run.communicate(timeout=30)
+    finally:
+        run.kill()
+    assert run.returncode == 0
+    assert "Exit without waiting for ['Hanging']" in stderr
+    # The lock is gone with the run, even though its check was still running
+    next_run = RunLock(lock_file)
+    assert next_run.acquire()
+    next_run.release()
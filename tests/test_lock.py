@@ -0,0 +1,26 @@
+from fractal_healthcheck.lock import RunLock
+from fractal_healthcheck.lock import describe_lock_holder
+from fractal_healthcheck.utils import atomic_write
+
+
+def test_run_lock(tmp_path):
+    lock_file = (tmp_path / "fractal-health.lock").as_posix()
+    first = RunLock(lock_file)
+    assert first.acquire()
+    assert not RunLock(lock_file).acquire()
+    description = describe_lock_holder(lock_file)
+    assert "Previous run still in progress (pid" in description
+    assert "running for" in description
+
+    first.release()
+    second = RunLock(lock_file)
+    assert second.acquire()
+    second.release()
+
+
+def test_atomic_write(tmp_path):
+    filename = tmp_path / "status.yaml"
+    atomic_write(filename.as_posix(), "a: 1\n")
+    atomic_write(filename.as_posix(), "a: 2\n")
+    assert filename.read_text() == "a: 2\n"
+    assert [p.name for p in tmp_path.iterdir()] == ["status.yaml"]
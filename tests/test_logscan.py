@@ -0,0 +1,54 @@
+from fractal_healthcheck.checks import logscan
+from fractal_healthcheck.checks.implementations import log_files
+
+
+def test_log_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(logscan, "CHUNK_SIZE", 64)
+    log = tmp_path / "fractal-server.log"
+    state_file = (tmp_path / "offsets.json").as_posix()
+    kwargs = dict(
+        files=[log.as_posix()],
+        target_words=["ERROR", "Traceback"],
+        state_file=state_file,
+        max_samples=2,
+    )
+    log.write_text("old ERROR, before the first scan\n")
+
+    # First scan: start from the end
+    result = log_files(**kwargs)
+    assert result.success
+    assert "scanned 0 bytes" in result.log
+
+    with log.open("a") as f:
+        f.write("INFO all good\n" * 10)
+        f.write("ERROR one\nTraceback (most recent call last): ERROR\n")
+        f.write("ERROR three\npartial ERROR line")
+    result = log_files(**kwargs)
+    assert not result.success
+    assert "Matches: 'ERROR': 3, 'Traceback': 1" in result.log
+    assert f"{log.as_posix()}: ERROR one\n" in result.log
+    assert "ERROR three" not in result.log  # Only `max_samples` lines
+    assert result.metrics == {"matches/ERROR": 3, "matches/Traceback": 1}
+
+    # Only new bytes are scanned, including the completed partial line
+    with log.open("a") as f:
+        f.write(" completed\n")
+    result = log_files(**kwargs)
+    assert "Matches: 'ERROR': 1, 'Traceback': 0" in result.log
+    assert "partial ERROR line completed" in result.log
+    assert log_files(**kwargs).success
+
+    # Rotation: the rest of the old file is scanned, then the new file
+    with log.open("a") as f:
+        f.write("ERROR before rotation\n")
+    log.rename(tmp_path / "fractal-server.log.1")
+    log.write_text("Traceback after rotation\n")
+    result = log_files(**kwargs)
+    assert "after rotation)" in result.log
+    assert "Matches: 'ERROR': 1, 'Traceback': 1" in result.log
+
+    # Truncation
+    log.write_text("")
+    result = log_files(**kwargs)
+    assert result.success
+    assert "after rotation" in result.log
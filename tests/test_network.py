@@ -0,0 +1,63 @@
+import asyncio
+import socket
+import time
+
+import pytest
+
+from fractal_healthcheck.checks.implementations import tcp_reachability
+from fractal_healthcheck.checks.network import parse_target
+
+
+def test_parse_target():
+    assert parse_target("localhost:5432") == ("localhost", 5432)
+    assert parse_target("[::1]:22") == ("::1", 22)
+    with pytest.raises(ValueError):
+        parse_target("localhost")
+
+
+def test_tcp_reachability():
+    listening = []
+    for _ in range(50):
+        sock = socket.socket()
+        sock.bind(("127.0.0.1", 0))
+        sock.listen()
+        listening.append(sock)
+    closed = socket.socket()
+    closed.bind(("127.0.0.1", 0))
+    closed_port = closed.getsockname()[1]
+    closed.close()
+    try:
+        targets = [f"127.0.0.1:{sock.getsockname()[1]}" for sock in listening]
+        t_start = time.perf_counter()
+        result = tcp_reachability(targets, timeout_seconds=2)
+        assert time.perf_counter() - t_start < 2
+        assert result.success
+        assert len(result.metrics) == 50
+
+        result = tcp_reachability(
+            targets[:2] + [f"127.0.0.1:{closed_port}"], timeout_seconds=2
+        )
+        assert not result.success
+        assert f"127.0.0.1:{closed_port} is not reachable." in result.log
+        assert "ConnectionRefusedError" in result.log
+
+        result = tcp_reachability(targets[:1], max_latency_ms=0)
+        assert not result.success
+        assert "latency exceeds max_latency_ms=0" in result.log
+    finally:
+        for sock in listening:
+            sock.close()
+
+
+def test_tcp_reachability_timeout(monkeypatch):
+    async def hanging_connection(host, port):
+        await asyncio.sleep(60)
+
+    monkeypatch.setattr(asyncio, "open_connection", hanging_connection)
+    t_start = time.perf_counter()
+    result = tcp_reachability(
+        [f"host{ind}:80" for ind in range(300)], timeout_seconds=0.5
+    )
+    assert time.perf_counter() - t_start < 2
+    assert not result.success
+    assert "Timeout (0.5 seconds)" in result.log
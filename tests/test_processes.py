@@ -0,0 +1,42 @@
+import subprocess
+import sys
+
+from fractal_healthcheck.checks.implementations import memory_usage
+from fractal_healthcheck.checks.implementations import top_processes
+from fractal_healthcheck.checks.processes import take_snapshot
+
+
+def test_take_snapshot():
+    # A process which looks like a Fractal task
+    proc = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            "import time; time.sleep(10)",
+            "/data/proj_v2_0000001_wf_0000002_job_0000042_20240101/0_task",
+        ]
+    )
+    try:
+        snapshot = take_snapshot(top_n=3)
+    finally:
+        proc.kill()
+        proc.wait()
+    assert snapshot.num_processes > 1
+    assert all(len(top) == 3 for top in snapshot.top.values())
+    rss = [p.rss_mb for p in snapshot.top["rss_mb"]]
+    assert rss == sorted(rss, reverse=True)
+    assert sum(num for num, _, _ in snapshot.by_user.values()) == snapshot.num_processes
+    assert "42" in snapshot.by_fractal_job
+
+
+def test_top_processes_and_failing_memory_usage():
+    result = top_processes(top_n=2)
+    assert result.success
+    assert "== Top 2 processes by RSS ==" in result.log
+    assert "== Top 2 users by RSS ==" in result.log
+
+    result = memory_usage(max_memory_usage=0, snapshot_top_n=2)
+    assert not result.success
+    assert "== Top 2 processes by threads ==" in result.log
+    result = memory_usage(max_memory_usage=0, snapshot_top_n=0)
+    assert "Top" not in result.log
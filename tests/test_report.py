@@ -0,0 +1,221 @@
+import json
+import subprocess
+
+import pytest
+
+from fractal_healthcheck.checks import Check
+from fractal_healthcheck.checks import CheckSuite
+from fractal_healthcheck.checks.CheckResults import CheckResult
+from fractal_healthcheck.report import GeneralSettings
+from fractal_healthcheck.report import prepare_report
+
+
+@pytest.fixture
+def check_suite() -> CheckSuite:
+    return CheckSuite(
+        checks=[
+            Check(
+                name="ok",
+                function_name="count_processes",
+                result=CheckResult(log="all good"),
+            ),
+            Check(
+                name="<broken>",
+                function_name="count_processes",
+                result=CheckResult(log="x" * 500, success=False),
+            ),
+        ]
+    )
+
+
+def test_prepare_report_text(check_suite: CheckSuite, caplog):
+    report = prepare_report(
+        check_suite,
+        checks_runtime=1.0,
+        instance_name="MyInstance",
+        general_settings=GeneralSettings(max_log_size=100),
+    )
+    assert "Total number of checks: 2" in report
+    assert "Number of failed checks: 1" in report
+    # Failing checks come first
+    assert report.index("Check: <broken>") < report.index("Check: ok")
+    assert "[TRUNCATED]" in report
+    assert report.endswith("End of report\n" + "-" * 80 + "\n\n")
+    assert len([r for r in caplog.records if "truncated" in r.message]) == 1
+
+
+def test_prepare_report_json_and_html(check_suite: CheckSuite):
+    kwargs = dict(
+        checks_runtime=1.0,
+        instance_name="MyInstance",
+        general_settings=GeneralSettings(max_log_size=100),
+    )
+    report = json.loads(prepare_report(check_suite, report_format="json", **kwargs))
+    assert report["summary"]["Number of failed checks"] == 1
+    assert [c["name"] for c in report["checks"]] == ["<broken>", "ok"]
+    assert report["checks"][0]["truncated"] is True
+    assert len(report["checks"][0]["log"]) == 100
+
+    report = prepare_report(check_suite, report_format="html", **kwargs)
+    assert "<h2>&lt;broken&gt;</h2>" in report
+    assert report.endswith("</html>\n")
+
+
+class FakeSMTP:
+    sent = []
+    num_connections = 0
+
+    def __init__(self, host, port, timeout):
+        FakeSMTP.num_connections += 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def ehlo(self):
+        pass
+
+    def noop(self):
+        return (250, b"OK")
+
+    def quit(self):
+        pass
+
+    def sendmail(self, from_addr, to_addrs, msg):
+        FakeSMTP.sent.append(msg)
+
+
+def _mail_settings(tmp_path, **kwargs):
+    from fractal_healthcheck.report import MailSettings
+
+    return MailSettings(
+        smtp_server="localhost",
+        smpt_server_port=2025,
+        sender="sender@example.org",
+        include_starttls=False,
+        include_login=False,
+        password="",
+        recipients=["example@example.org"],
+        status_file=(tmp_path / "status.yaml").as_posix(),
+        instance_name="MyInstance",
+        **kwargs,
+    )
+
+
+def test_check_result_serialization():
+    error = subprocess.CalledProcessError(1, ["false"], stderr="some error")
+    result = CheckResult(exception=error, success=False, metrics={"x": 1.5})
+    assert isinstance(result.exception, str)
+    assert result.full_log == (
+        "<class 'subprocess.CalledProcessError'>: 1, stderr: some error\n"
+    )
+    assert not hasattr(result, "__dict__")
+
+    restored = CheckResult.from_json(result.to_json())
+    assert restored == result
+    assert restored.status == "FAIL"
+    assert restored.format_for_report(
+        "name", max_log_size=100
+    ) == result.format_for_report("name", max_log_size=100)
+
+
+def test_report_to_email_on_state_change(tmp_path, monkeypatch):
+    from fractal_healthcheck.report import LastMailStatus
+    from fractal_healthcheck.report import report_to_email
+
+    monkeypatch.setattr("smtplib.SMTP", FakeSMTP)
+    FakeSMTP.sent = []
+    mail_settings = _mail_settings(tmp_path)
+
+    def _run(partial=False, **logs_and_success):
+        suite = CheckSuite(
+            checks=[
+                Check(
+                    name=name,
+                    function_name="count_processes",
+                    result=CheckResult(log=log, success=success),
+                )
+                for name, (log, success) in logs_and_success.items()
+            ]
+        )
+        num_sent = len(FakeSMTP.sent)
+        report_to_email(
+            check_suite=suite,
+            report="FULL REPORT",
+            mail_settings=mail_settings,
+            partial=partial,
+        )
+        return FakeSMTP.sent[num_sent:]
+
+    # First report: full body
+    sent = _run(a=("ok", True), b=("ok", True))
+    assert len(sent) == 1
+    assert "FULL REPORT" in sent[0]
+    # No change, within grace time
+    assert _run(a=("ok", True), b=("ok", True)) == []
+    # Newly failing: immediate email, with a diff body
+    sent = _run(a=("ok", True), b=("broken disk", False))
+    assert len(sent) == 1
+    assert "Subject: [Fractal, MyInstance] WARNING" in sent[0]
+    assert "Newly failing checks:\n * b\n" in sent[0]
+    assert "broken disk" in sent[0]
+    assert "FULL REPORT" not in sent[0]
+    # Still failing (even with a new output): rate-limited
+    assert _run(a=("ok", True), b=("broken disk, again", False)) == []
+    with open(mail_settings.status_file) as f:
+        status = LastMailStatus.from_yaml(f)
+    assert status.checks["b"]["status"] == "FAIL"
+    # A partial run (e.g. lock-only report) keeps the state of other checks
+    assert len(_run(partial=True, **{"Previous run": ("locked", False)})) == 1
+    assert _run(partial=True, **{"Previous run": ("locked", False)}) == []
+    with open(mail_settings.status_file) as f:
+        status = LastMailStatus.from_yaml(f)
+    assert set(status.checks) == {"a", "b", "Previous run"}
+    assert _run(a=("ok", True), b=("broken disk, again", False)) == []
+    # A full run does not keep the state of the partial run
+    with open(mail_settings.status_file) as f:
+        status = LastMailStatus.from_yaml(f)
+    assert set(status.checks) == {"a", "b"}
+    # Recovered: immediate email
+    sent = _run(a=("ok", True), b=("ok", True))
+    assert len(sent) == 1
+    assert "Subject: [Fractal, MyInstance] RECOVERED" in sent[0]
+    assert "Recovered checks:\n * b\n" in sent[0]
+
+
+def test_large_report_attachment_and_smtp_session(
+    tmp_path, monkeypatch, check_suite: CheckSuite
+):
+    import email
+    import gzip
+
+    from fractal_healthcheck.report import SMTPSession
+    from fractal_healthcheck.report import prepare_email
+
+    monkeypatch.setattr("smtplib.SMTP", FakeSMTP)
+    FakeSMTP.sent = []
+    FakeSMTP.num_connections = 0
+    mail_settings = _mail_settings(tmp_path, max_inline_size=1000)
+    report = prepare_report(
+        check_suite,
+        checks_runtime=1.0,
+        instance_name="MyInstance",
+        general_settings=GeneralSettings(max_log_size=2000),
+    )
+    assert len(report) > 1000
+
+    msg = prepare_email(report, subject="Subject", mail_settings=mail_settings)
+    with SMTPSession(mail_settings) as session:
+        session.send(msg)
+        session.send(prepare_email("short", subject="S", mail_settings=mail_settings))
+    assert FakeSMTP.num_connections == 1
+
+    parsed = email.message_from_string(FakeSMTP.sent[0])
+    inline, attachment = [part for part in parsed.walk() if not part.is_multipart()]
+    assert "# Recap" in inline.get_payload(decode=True).decode()
+    assert "# Detailed report" not in inline.get_payload(decode=True).decode()
+    assert attachment.get_filename() == "fractal-health-report.txt.gz"
+    assert gzip.decompress(attachment.get_payload(decode=True)).decode() == report
+    assert not email.message_from_string(FakeSMTP.sent[1]).is_multipart()
@@ -0,0 +1,57 @@
+import psutil
+
+from fractal_healthcheck.checks.implementations import memory_usage
+from fractal_healthcheck.checks.implementations import system_load
+from fractal_healthcheck.checks.sampling import SampleBuffer
+
+
+def test_sample_buffer():
+    buffer = SampleBuffer(capacity=20)
+    assert buffer.stats() is None
+    for value in range(30):
+        buffer.add(value)
+    assert buffer.count == 20
+    assert list(buffer.values()) == list(range(10, 30))
+    stats = buffer.stats(threshold=25)
+    assert stats["min"] == 10
+    assert stats["mean"] == 19.5
+    assert stats["p95"] == 28
+    assert stats["max"] == 29
+    assert stats["perc_above_threshold"] == 25.0
+
+
+def test_sampled_checks(tmp_path, monkeypatch):
+    (tmp_path / "loadavg").write_text("1.60 0.58 0.59 2/1234 56789\n")
+    (tmp_path / "meminfo").write_text(
+        "MemTotal:       1000 kB\nMemFree:         50 kB\nMemAvailable:   100 kB\n"
+    )
+    (tmp_path / "pressure").mkdir()
+    (tmp_path / "pressure" / "memory").write_text(
+        "some avg10=0.00 avg60=0.00 avg300=0.00 total=0\n"
+        "full avg10=0.00 avg60=0.00 avg300=0.00 total=0\n"
+    )
+    monkeypatch.setattr(psutil, "PROCFS_PATH", tmp_path.as_posix())
+    monkeypatch.setattr(psutil, "cpu_count", lambda: 2)
+
+    result = system_load(
+        max_load_fraction=0.9, sample_window_seconds=0.1, sample_interval_seconds=0.01
+    )
+    assert result.success
+    assert "10 samples" in result.log
+    assert "Load fraction: min=0.80" in result.log
+    # No CPU pressure available
+    assert "CPU pressure" not in result.log
+
+    result = memory_usage(
+        max_memory_usage=85, sample_window_seconds=0.1, sample_interval_seconds=0.01
+    )
+    assert not result.success
+    assert "max=90.00%, above threshold 100.0% of the time" in result.log
+    assert "Memory pressure (some): min=0.00%" in result.log
+    # The snapshot of processes cannot be taken from the fake `/proc`
+    assert "Cannot take a snapshot of processes" in result.log
+
+    (tmp_path / "meminfo").unlink()
+    result = memory_usage(sample_window_seconds=0.1)
+    assert not result.success
+    assert result.exception is not None
@@ -0,0 +1,78 @@
+import subprocess
+import sys
+from datetime import datetime
+from datetime import timedelta
+
+import pytest
+
+from fractal_healthcheck.checks.capture import stream_lines
+from fractal_healthcheck.checks.implementations import slurm_status
+
+
+def _script(lines, returncode=0) -> str:
+    return (
+        "import sys\n"
+        f"for line in {lines!r}:\n"
+        "    print(line)\n"
+        "print('some warning', file=sys.stderr)\n"
+        f"sys.exit({returncode})\n"
+    )
+
+
+def test_slurm_status(fake_executable):
+    now = datetime.now().replace(microsecond=0)
+    old = (now - timedelta(hours=30)).isoformat()
+    recent = (now - timedelta(hours=1)).isoformat()
+    fake_executable(
+        "squeue",
+        _script(
+            [f"RUNNING|fractal|None|{recent}"] * 3
+            + [
+                f"PENDING|fractal|Resources|{recent}",
+                f"PENDING|alice|Priority|{old}",
+                f"PENDING|alice|Priority|{recent}",
+            ]
+        ),
+    )
+    fake_executable(
+        "sinfo",
+        _script(
+            [
+                "node1|mix|none",
+                "node1|mix|none",
+                "node2|idle|none",
+                "node3|drain|Bad disk",
+                "node4|idle*|Not responding",
+            ]
+        ),
+    )
+
+    result = slurm_status()
+    assert not result.success
+    assert "Jobs: 6 (RUNNING: 3, PENDING: 3)" in result.log
+    assert "Top 10 users by jobs: fractal: 4, alice: 2" in result.log
+    assert "Pending reasons: Priority: 2, Resources: 1" in result.log
+    assert f"Oldest pending job: submitted {old.replace('T', ' ')}" in result.log
+    assert "Nodes: 4 (mix: 1, idle: 1, drain: 1, idle*: 1)" in result.log
+    assert " * node3 (drain, Bad disk)" in result.log
+    assert "2 unavailable nodes exceed max_unavailable_nodes=0." in result.log
+    assert "Oldest pending job exceeds" in result.log
+    assert result.metrics["pending_jobs"] == 3
+
+    result = slurm_status(max_oldest_pending_hours=48, max_unavailable_nodes=2)
+    assert result.success
+
+    fake_executable("sinfo", _script([], returncode=1))
+    result = slurm_status()
+    assert not result.success
+    assert "some warning" in result.full_log
+
+
+def test_stream_lines_timeout():
+    lines = stream_lines(
+        [sys.executable, "-c", "import time; print('a', flush=True); time.sleep(10)"],
+        timeout=0.5,
+    )
+    assert next(lines) == "a"
+    with pytest.raises(subprocess.TimeoutExpired):
+        next(lines)
@@ -0,0 +1,62 @@
+from fractal_healthcheck.checks.implementations import service_is_active
+from fractal_healthcheck.checks.implementations import systemd_cgroup_usage
+
+SYSTEMCTL_SHOW = """\
+ActiveState=active
+ControlGroup=/system.slice/fractal-server.service
+
+ActiveState=failed
+ControlGroup=
+"""
+
+
+def _fake_systemctl(tmp_path, fake_executable):
+    fake_executable(
+        "systemctl",
+        "import sys\n"
+        f"sys.stdout.write({SYSTEMCTL_SHOW!r})\n"
+        f"open({(tmp_path / 'args').as_posix()!r}, 'w').write(' '.join(sys.argv[1:]))\n",
+    )
+
+
+def test_systemd_cgroup_usage(tmp_path, fake_executable):
+    _fake_systemctl(tmp_path, fake_executable)
+    cgroup = tmp_path / "cgroup" / "system.slice" / "fractal-server.service"
+    cgroup.mkdir(parents=True)
+    (cgroup / "memory.current").write_text(f"{300 * 2**20}\n")
+    (cgroup / "memory.events").write_text("low 0\nhigh 0\nmax 0\noom 1\noom_kill 1\n")
+    (cgroup / "cpu.stat").write_text("usage_usec 2500000\nuser_usec 2000000\n")
+    (cgroup / "pids.current").write_text("12\n")
+
+    result = systemd_cgroup_usage(
+        units=["fractal-server", "fractal-web"],
+        limits={"fractal-server": {"max_memory_mb": 200, "max_pids": 100}},
+        cgroup_root=(tmp_path / "cgroup").as_posix(),
+    )
+    assert (tmp_path / "args").read_text() == (
+        "show --property=ActiveState,ControlGroup fractal-server fractal-web"
+    )
+    assert not result.success
+    assert "fractal-web is failed." in result.log
+    assert "fractal-server: max_memory_mb=200 exceeded (300.0)." in result.log
+    assert "max_pids" not in result.log
+    assert result.metrics == {
+        "fractal-server/memory_mb": 300.0,
+        "fractal-server/oom_kills": 1,
+        "fractal-server/cpu_seconds": 2.5,
+        "fractal-server/pids": 12,
+    }
+
+    result = systemd_cgroup_usage(
+        units=["fractal-server", "fractal-web"], limits={"other": {"max_pids": 1}}
+    )
+    assert not result.success
+    assert "Invalid limits for unit 'other'" in result.full_log
+
+
+def test_service_is_active(tmp_path, fake_executable):
+    _fake_systemctl(tmp_path, fake_executable)
+    result = service_is_active(["fractal-server", "fractal-web"], use_user=True)
+    assert not result.success
+    assert '"fractal-web": "failed"' in result.log
+    assert (tmp_path / "args").read_text().startswith("--user show")
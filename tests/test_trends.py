@@ -0,0 +1,78 @@
+import pytest
+
+from fractal_healthcheck.checks import Check
+from fractal_healthcheck.checks import CheckSuite
+from fractal_healthcheck.checks.CheckResults import CheckResult
+from fractal_healthcheck.checks.history import CheckHistory
+
+np = pytest.importorskip("numpy")
+
+from fractal_healthcheck.checks.trends import analyze  # noqa: E402
+from fractal_healthcheck.checks.trends import apply_trends  # noqa: E402
+
+
+def test_analyze():
+    hours = [3600.0 * h for h in range(10)]
+    series = [
+        # +1 per hour, from 50
+        (hours, [50.0 + h for h in range(10)]),
+        # Flat, then a jump
+        (hours, [10.0] * 5 + [11.0, 9.0] * 2 + [30.0]),
+        # Short series
+        (hours[:3], [1.0, 1.0, 1.0]),
+        # Flat, then a small change
+        (hours, [50.0] * 9 + [50.1]),
+    ]
+    analysis = analyze(
+        series,
+        ewma_alpha=np.array([1.0, 0.3, 0.3, 0.3]),
+        limit=np.array([100.0, np.inf, 0.5, np.inf]),
+        window=10,
+    )
+    assert list(analysis["num_points"]) == [10, 10, 3, 10]
+    assert analysis["slope"][0] == pytest.approx(1.0)
+    assert analysis["hours_to_limit"][0] == pytest.approx(41.0)
+    assert np.isinf(analysis["hours_to_limit"][1])
+    assert analysis["hours_to_limit"][2] == 0
+    assert analysis["zscore"][1] > 10
+    assert analysis["zscore"][2] == 0
+    assert analysis["zscore"][3] == pytest.approx(0.2)
+
+
+def test_apply_trends():
+    suite = CheckSuite(
+        checks=[
+            Check(
+                name=name,
+                function_name="disk_usage",
+                trend=dict(metric="percent", limit=100, min_hours_to_limit=48),
+                result=CheckResult(log="Disk usage", runtime=0.1),
+            )
+            for name in ("Filling", "Stable", "New")
+        ]
+    )
+    checks = {
+        "Filling": [50.0 + h for h in range(20)],
+        "Stable": [50.0] * 20,
+        "New": [90.0],
+    }
+    history = CheckHistory(
+        checks={
+            name: {
+                "metrics": {
+                    "percent": {
+                        "times": [3600.0 * h for h in range(len(values))],
+                        "values": values,
+                    }
+                }
+            }
+            for name, values in checks.items()
+        }
+    )
+    apply_trends(suite, history)
+    results = suite.get_results()
+    assert not results["Filling"].success
+    assert "Forecast to reach 100.0 in" in results["Filling"].log
+    assert results["Stable"].success
+    assert "Not forecast to reach 100.0." in results["Stable"].log
+    assert results["New"].log == "Disk usage"